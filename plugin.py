@@ -7,14 +7,22 @@
             <li>Configurable GPIO pins via gpio_config.json</li>
             <li>Active LOW / Active HIGH support</li>
             <li>Custom relay names</li>
-            <li>Auto-reload configuration on Domoticz restart</li>
+            <li>Relay groups switched with a single batched write</li>
+            <li>Selector switches and time-proportioned (PWM) relays</li>
+            <li>1-Wire (DS18B20) and sysfs sensors read in parallel</li>
+            <li>Relays on several GPIO chips and expanders (MCP23017, PCF8574)</li>
+            <li>Relay banks on chained 74HC595 shift registers</li>
+            <li>Auto-reload configuration when gpio_config.json changes</li>
             <li>Supports gpiod v1.x and v2.x</li>
+            <li>Simulated GPIO chip for testing without hardware</li>
         </ul>
         <h3>Configuration</h3>
         Edit gpio_config.json in the plugin directory:<br/>
         <code>nano domoticz/plugins/DomoticzRPIGPIO/gpio_config.json</code><br/>
         <br/>
-        Then restart Domoticz:<br/>
+        Changes are applied automatically within one heartbeat (about 10 seconds).<br/>
+        Changing backend, gpio_chip, relay_logic, pin_logic, command_queue, shift_registers, state_journal,
+        control_socket or trace needs a restart:<br/>
         <code>sudo systemctl restart domoticz</code><br/>
         <br/>
         <h3>GPIO Pins</h3>
@@ -36,28 +44,1946 @@
 """
 
 import Domoticz
+import bisect
+import collections
+import concurrent.futures
+import difflib
+import glob
+import heapq
+import itertools
 import json
 import os
+import select
+import socket
+import struct
+import threading
+import time
+import zlib
+
+# Relay devices use units 1-99
+MAX_RELAYS = 99
+
+# Group devices get their own unit range so they never collide with relays
+GROUP_UNIT_BASE = 200
+MAX_GROUPS = 55
+
+# Input devices (contacts, buttons) get units 100-139
+INPUT_UNIT_BASE = 100
+MAX_INPUTS = 40
+
+# Selector switches (multi-speed fans, heater stages) get units 140-159;
+# Domoticz selector levels are 0, 10, 20, ... (level index * 10)
+SELECTOR_UNIT_BASE = 140
+MAX_SELECTORS = 20
+MAX_SELECTOR_LEVELS = 11
+
+# Sensors (1-Wire temperature probes, sysfs values) get units 160-189
+SENSOR_UNIT_BASE = 160
+MAX_SENSORS = 30
+SENSOR_TYPES = ["temperature", "custom"]
+W1_BUS_PATH = "/sys/bus/w1/devices"
+
+# Domoticz custom sensors for plugin metrics
+METRICS_UNIT_BASE = 190
+MAX_UNITS = 256
+
+# Upper bounds of the latency histogram buckets (microseconds)
+LATENCY_BUCKETS_US = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 1000000]
+METRICS_STAGES = ["queue", "write", "update", "total"]
+STAGE_QUEUE, STAGE_WRITE, STAGE_UPDATE, STAGE_TOTAL = range(len(METRICS_STAGES))
+METRICS_FORMATS = ["prometheus", "json"]
+
+# Domoticz Switchtype for each input type
+INPUT_SWITCH_TYPES = {"switch": 0, "contact": 2, "motion": 8, "door": 11}
+INPUT_BIAS = ["as_is", "disabled", "pull_up", "pull_down"]
+INPUT_EVENT_BUFFER = 64
+
+# Actions of local input -> output bindings
+BINDING_ACTIONS = ["toggle", "follow", "pulse"]
+
+GPIO_CONSUMER = "domoticz-gpio"
+
+QUEUE_OVERFLOW_POLICIES = ["drop_oldest", "drop_newest", "block"]
+
+# What to do when an output line no longer has the level of its relay state:
+# write the expected level again, or take the line level as the new state
+READBACK_POLICIES = ["correct", "adopt"]
+
+# Repeated errors with the same key are logged at most once per interval
+ERROR_LOG_INTERVAL = 60
+
+# Chained 74HC595 registers per shift register bank (8 outputs each)
+MAX_SHIFT_REGISTERS = 32
+
+# State journal: two fixed-size slots, each a header, the pending timers
+# and a CRC32 of both
+JOURNAL_MAGIC = b"RGPJ"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sBBxxIQ16s")  # magic, version, timers, config id, sequence, relay mask
+JOURNAL_TIMER = struct.Struct("<BBxxQ")  # unit, command, deadline (ms since the epoch)
+JOURNAL_MAX_TIMERS = 32
+JOURNAL_SLOT_SIZE = 512
+JOURNAL_COMMANDS = ["Off", "On", "Toggle"]
+JOURNAL_LEVEL = 128  # Selector level commands are stored as JOURNAL_LEVEL + level
+
+# Scheduler key of the release of relays held back by the inrush limit (units start at 1)
+INRUSH_TIMER = 0
+
+# Time-proportioned relays: edges closer together than this are applied together
+PROPORTIONING_RESOLUTION = 0.01
+
+# Format version of the header record of command traces
+TRACE_VERSION = 2
+
+# Longest request line accepted on the control socket
+CONTROL_MAX_LINE = 1024
+
+# Settings that can't be changed by a configuration reload
+RESTART_ONLY_KEYS = ["backend", "gpio_chip", "relay_logic", "pin_logic", "command_queue", "shift_registers",
+                     "state_journal", "control_socket", "trace"]
+
+# Keys of gpio_config.json: None is a value, a dict an object, [dict] a list
+# of objects. Keys starting with "_" are comments and never reported.
+CONFIG_SCHEMA = {
+    "gpio_pins": None,
+    "relay_logic": None,
+    "pin_logic": [{"pins": None, "relay_logic": None}],
+    "gpio_chip": None,
+    "relay_names": None,
+    "backend": None,
+    "shift_registers": [dict.fromkeys(["name", "chip", "registers", "data", "clock", "latch", "oe"])],
+    "relay_groups": [{"name": None, "pins": None}],
+    "selectors": [{
+        "name": None,
+        "pins": None,
+        "break_before_make_ms": None,
+        "levels": [{"name": None, "pins": None}],
+    }],
+    "time_proportioning": dict.fromkeys(["pins", "cycle_s", "min_on_s", "min_off_s"]),
+    "sensors": dict(
+        dict.fromkeys(["interval_s", "report_interval_s", "threshold", "workers", "bulk_conversion", "bus_path"]),
+        devices=[dict.fromkeys(["id", "path", "name", "type", "unit", "scale", "threshold"])]
+    ),
+    "inrush": dict.fromkeys(["max_on", "spacing_ms", "urgent_pins"]),
+    "relay_timers": [dict.fromkeys(["pin", "pulse_ms", "auto_off_s"])],
+    "inputs": [dict.fromkeys(["pin", "name", "type", "bias", "active_low", "debounce_ms"])],
+    "bindings": [dict.fromkeys(["input", "unit", "action", "pulse_ms"])],
+    "command_queue": dict.fromkeys(["enabled", "size", "overflow"]),
+    "metrics": dict.fromkeys(["file", "format", "interval_s", "domoticz_sensors"]),
+    "state_journal": dict.fromkeys(["file", "sync_interval_ms"]),
+    "control_socket": dict.fromkeys(["path", "mode"]),
+    "readback": dict.fromkeys(["policy", "interval_s", "max_interval_s"]),
+    "trace": dict.fromkeys(["file", "gpio_writes"]),
+    "config_reload": None,
+}
+
+# Default of every optional key with a fixed default, by its path in
+# CONFIG_SCHEMA (list items without an index), for load_config and the
+# code using the key alike (see setting)
+CONFIG_DEFAULTS = {
+    "backend": "auto",
+    "relay_logic": "active_low",
+    "gpio_chip": "gpiochip0",
+    "config_reload": True,
+    "selectors.break_before_make_ms": 0,
+    "time_proportioning.min_on_s": 0,
+    "time_proportioning.min_off_s": 0,
+    "sensors.interval_s": 60,
+    "sensors.report_interval_s": 300,
+    "sensors.threshold": 0.1,
+    "sensors.workers": 4,
+    "sensors.bulk_conversion": True,
+    "sensors.bus_path": W1_BUS_PATH,
+    "sensors.devices.type": "temperature",
+    "sensors.devices.unit": "",
+    "sensors.devices.scale": 1,
+    "inrush.spacing_ms": 250,
+    "inputs.type": "contact",
+    "inputs.bias": "as_is",
+    "inputs.active_low": False,
+    "inputs.debounce_ms": 0,
+    "bindings.pulse_ms": 0,
+    "command_queue.enabled": True,
+    "command_queue.size": 64,
+    "command_queue.overflow": "drop_oldest",
+    "metrics.format": "prometheus",
+    "metrics.interval_s": 60,
+    "metrics.domoticz_sensors": False,
+    "state_journal.file": "relay_state.bin",
+    "state_journal.sync_interval_ms": 1000,
+    "control_socket.path": "control.sock",
+    "control_socket.mode": "660",
+    "readback.policy": "correct",
+    "readback.interval_s": 30,
+    "readback.max_interval_s": 600,
+    "trace.file": "trace.jsonl",
+    "trace.gpio_writes": True,
+}
+
+# One relay of the compiled configuration (see compile_relays): unit, pin as
+# configured, polarity and the relay's bit in the output mask
+RelayPin = collections.namedtuple("RelayPin", ["unit", "pin", "active_low", "bit"])
+
+
+class GpioBackend:
+    """Base class for GPIO backends, selected once in onStart
+    
+    One backend instance drives the lines of one GPIO chip, GPIO pins are
+    line offsets on that chip. All values are logical: 1 = active (relay
+    ON). Output lines in active_low are driven LOW when active; the
+    inversion is done by the line request, not by the plugin.
+    """
+    name = "base"
+    
+    def find_chip(self, chip_name):
+        """Device path of a chip given by name (gpiochip2), path or label"""
+        if chip_name.startswith("/"):
+            return chip_name
+        if chip_name.startswith("gpiochip") and chip_name[8:].isdigit():
+            return f"/dev/{chip_name}"
+        for chip_path in sorted(glob.glob("/dev/gpiochip*")):
+            if self.chip_label(chip_path) == chip_name:
+                return chip_path
+        raise ValueError(f"GPIO chip '{chip_name}' not found")
+    
+    def chip_label(self, chip_path):
+        """Label of a chip, e.g. pinctrl-bcm2711 or mcp23017"""
+        raise NotImplementedError
+    
+    def open(self, chip_path, initial_values, active_low=()):
+        """Request all lines as outputs; initial_values maps GPIO pin -> value"""
+        raise NotImplementedError
+    
+    def set_value(self, gpio_pin, value):
+        """Set a single line"""
+        raise NotImplementedError
+    
+    def set_values(self, values):
+        """Set several lines (GPIO pin -> value) with one write"""
+        raise NotImplementedError
+    
+    def get_values(self):
+        """Read back the value of every output line, one read per request"""
+        raise NotImplementedError
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        """Request added lines and give up removed ones (config reload)
+        
+        values maps every output GPIO pin that stays or is added -> value.
+        Lines that are neither added nor removed must not change.
+        """
+        raise NotImplementedError
+    
+    def release(self):
+        """Release all requested lines"""
+        raise NotImplementedError
+    
+    # Inputs are logical too: True = active (after the input's active_low)
+    kernel_debounce = False
+    
+    def open_inputs(self, chip_path, inputs):
+        """Request input lines with edge detection on both edges
+        
+        inputs maps GPIO pin -> input config (bias, active_low, debounce_ms).
+        """
+        raise NotImplementedError
+    
+    def input_fds(self):
+        """File descriptors that become readable when edge events are pending"""
+        raise NotImplementedError
+    
+    def read_input_events(self, fd):
+        """Read all pending edge events of one readable fd as (pin, active)"""
+        raise NotImplementedError
+    
+    def get_input_values(self):
+        """Current value of every input line as GPIO pin -> active"""
+        raise NotImplementedError
+    
+    def release_inputs(self):
+        """Release the input lines"""
+        raise NotImplementedError
+
+
+class GpiodV1Backend(GpioBackend):
+    """libgpiod v1.x: output lines requested as LineBulk blocks
+    
+    open() requests all lines as one bulk, or two if active-low and
+    active-high lines are mixed (the flag is per bulk); lines added later by
+    a config reload get bulks of their own. A bulk is always written as a
+    whole.
+    """
+    name = "gpiod v1"
+    
+    def __init__(self, gpiod_module):
+        self.gpiod = gpiod_module
+        self.chip = None
+        self.blocks = {}  # GPIO pin -> [line_bulk, pin index, values]
+        self.parked = {}  # Removed GPIO pin -> block it is still requested in
+        self.input_lines = {}
+    
+    def chip_label(self, chip_path):
+        chip = self.gpiod.Chip(chip_path)
+        try:
+            return chip.label()
+        finally:
+            chip.close()
+    
+    def open(self, chip_path, initial_values, active_low=()):
+        if self.chip is None:
+            self.chip = self.gpiod.Chip(chip_path)
+        self.blocks = {}
+        self.parked = {}
+        self.request_blocks(initial_values, active_low)
+    
+    def request_blocks(self, values, active_low):
+        """Request the lines of values, one bulk per polarity"""
+        for flags, gpio_pins in (
+            (self.gpiod.LINE_REQ_FLAG_ACTIVE_LOW, [gpio_pin for gpio_pin in values if gpio_pin in active_low]),
+            (0, [gpio_pin for gpio_pin in values if gpio_pin not in active_low]),
+        ):
+            if not gpio_pins:
+                continue
+            line_bulk = self.chip.get_lines(gpio_pins)
+            block = [
+                line_bulk,
+                {gpio_pin: idx for idx, gpio_pin in enumerate(gpio_pins)},
+                [values[gpio_pin] for gpio_pin in gpio_pins]
+            ]
+            line_bulk.request(
+                consumer=GPIO_CONSUMER,
+                type=self.gpiod.LINE_REQ_DIR_OUT,
+                default_vals=list(block[2]),
+                flags=flags
+            )
+            for gpio_pin in gpio_pins:
+                self.blocks[gpio_pin] = block
+    
+    def set_value(self, gpio_pin, value):
+        line_bulk, index, values = self.blocks[gpio_pin]
+        values[index[gpio_pin]] = value
+        line_bulk.set_values(values)
+    
+    def set_values(self, values):
+        written = {}
+        for gpio_pin, value in values.items():
+            block = self.blocks[gpio_pin]
+            block[2][block[1][gpio_pin]] = value
+            written[id(block)] = block
+        for line_bulk, index, block_values in written.values():
+            line_bulk.set_values(block_values)
+    
+    def get_values(self):
+        values = {}
+        blocks = {id(block): block for block in self.blocks.values()}
+        for line_bulk, index, block_values in blocks.values():
+            levels = line_bulk.get_values()
+            # Bulk writes send every line from the cache, so it has to follow
+            # what was read back or an adopted level is undone by the next write
+            block_values[:] = levels
+            # Parked lines are still part of the bulk but not outputs any more
+            for gpio_pin, idx in index.items():
+                if gpio_pin in self.blocks:
+                    values[gpio_pin] = levels[idx]
+        return values
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        # v1 cannot shrink a bulk: removed lines stay requested (at their
+        # last value) until no line of their bulk is in use any more
+        for gpio_pin in remove_pins:
+            self.parked[gpio_pin] = self.blocks.pop(gpio_pin)
+        
+        live_blocks = {id(block) for block in self.blocks.values()}
+        released = set()
+        for gpio_pin, block in list(self.parked.items()):
+            if id(block) not in live_blocks:
+                if id(block) not in released:
+                    block[0].release()
+                    released.add(id(block))
+                del self.parked[gpio_pin]
+        
+        added = {gpio_pin: value for gpio_pin, value in values.items() if gpio_pin not in self.blocks}
+        reused = {gpio_pin: value for gpio_pin, value in added.items() if gpio_pin in self.parked}
+        for gpio_pin in reused:
+            self.blocks[gpio_pin] = self.parked.pop(gpio_pin)
+        if reused:
+            self.set_values(reused)
+        
+        new = {gpio_pin: value for gpio_pin, value in added.items() if gpio_pin not in reused}
+        if new:
+            self.request_blocks(new, active_low)
+    
+    def release(self):
+        released = set()
+        for block in list(self.blocks.values()) + list(self.parked.values()):
+            if id(block) not in released:
+                block[0].release()
+                released.add(id(block))
+        self.blocks = {}
+        self.parked = {}
+        if self.chip:
+            self.chip.close()
+            self.chip = None
+    
+    def open_inputs(self, chip_path, inputs):
+        bias_flags = {
+            "as_is": 0,
+            "disabled": getattr(self.gpiod, 'LINE_REQ_FLAG_BIAS_DISABLE', 0),
+            "pull_up": getattr(self.gpiod, 'LINE_REQ_FLAG_BIAS_PULL_UP', 0),
+            "pull_down": getattr(self.gpiod, 'LINE_REQ_FLAG_BIAS_PULL_DOWN', 0),
+        }
+        if self.chip is None:
+            self.chip = self.gpiod.Chip(chip_path)
+        
+        # v1 requests share flags per bulk, so each input is requested separately
+        self.input_lines = {}
+        for gpio_pin, input_config in inputs.items():
+            flags = bias_flags[setting(input_config, "inputs.bias")]
+            if setting(input_config, "inputs.active_low"):
+                flags |= self.gpiod.LINE_REQ_FLAG_ACTIVE_LOW
+            line = self.chip.get_line(gpio_pin)
+            line.request(
+                consumer=GPIO_CONSUMER,
+                type=self.gpiod.LINE_REQ_EV_BOTH_EDGES,
+                flags=flags
+            )
+            self.input_lines[line.event_get_fd()] = (gpio_pin, line)
+    
+    def input_fds(self):
+        return list(self.input_lines)
+    
+    def read_input_events(self, fd):
+        gpio_pin, line = self.input_lines[fd]
+        rising = self.gpiod.LineEvent.RISING_EDGE
+        return [(gpio_pin, event.type == rising) for event in line.event_read_multiple()]
+    
+    def get_input_values(self):
+        return {gpio_pin: bool(line.get_value()) for gpio_pin, line in self.input_lines.values()}
+    
+    def release_inputs(self):
+        for gpio_pin, line in self.input_lines.values():
+            line.release()
+        self.input_lines = {}
+
+
+class GpiodV2Backend(GpioBackend):
+    """libgpiod v2.x: output lines requested with request_lines()
+    
+    open() requests all lines at once; lines added later by a config reload
+    get a request of their own, removed lines are switched to input with
+    reconfigure_lines() so the other lines of their request are untouched.
+    """
+    name = "gpiod v2"
+    
+    def __init__(self, gpiod_module):
+        from gpiod.line import Bias, Direction, Edge, Value
+        self.gpiod = gpiod_module
+        self.direction_output = Direction.OUTPUT
+        self.direction_input = Direction.INPUT
+        self.edge_both = Edge.BOTH
+        self.bias = {
+            "as_is": Bias.AS_IS,
+            "disabled": Bias.DISABLED,
+            "pull_up": Bias.PULL_UP,
+            "pull_down": Bias.PULL_DOWN,
+        }
+        self.rising_edge = gpiod_module.EdgeEvent.Type.RISING_EDGE
+        self.value_active = Value.ACTIVE
+        # Value -> gpiod Value, resolved once instead of on every write
+        self.levels = (Value.INACTIVE, Value.ACTIVE)
+        self.active_low = set()
+        self.chip_path = None
+        self.line_request = None  # Request of open(), used while it is the only one
+        self.requests = {}  # GPIO pin -> line request
+        self.parked = {}  # Removed GPIO pin -> line request it is still part of
+        self.input_request = None
+    
+    def chip_label(self, chip_path):
+        with self.gpiod.Chip(chip_path) as chip:
+            return chip.get_info().label
+    
+    def open(self, chip_path, initial_values, active_low=()):
+        self.chip_path = chip_path
+        self.active_low = set(active_low)
+        self.requests = {}
+        self.parked = {}
+        self.line_request = self.request_outputs(initial_values)
+    
+    def request_outputs(self, values):
+        line_request = self.gpiod.request_lines(
+            self.chip_path,
+            consumer=GPIO_CONSUMER,
+            config={gpio_pin: self.output_settings(gpio_pin, value) for gpio_pin, value in values.items()}
+        )
+        for gpio_pin in values:
+            self.requests[gpio_pin] = line_request
+        return line_request
+    
+    def output_settings(self, gpio_pin, value):
+        return self.gpiod.LineSettings(
+            direction=self.direction_output,
+            output_value=self.levels[value],
+            active_low=gpio_pin in self.active_low
+        )
+    
+    def set_value(self, gpio_pin, value):
+        self.requests[gpio_pin].set_value(gpio_pin, self.levels[value])
+    
+    def set_values(self, values):
+        levels = self.levels
+        if self.line_request:
+            self.line_request.set_values({gpio_pin: levels[value] for gpio_pin, value in values.items()})
+            return
+        
+        # Several requests: one set_values() call per request
+        written = {}
+        for gpio_pin, value in values.items():
+            line_request = self.requests[gpio_pin]
+            written.setdefault(id(line_request), (line_request, {}))[1][gpio_pin] = levels[value]
+        for line_request, request_values in written.values():
+            line_request.set_values(request_values)
+    
+    def get_values(self):
+        request_pins = {}
+        for gpio_pin, line_request in self.requests.items():
+            request_pins.setdefault(id(line_request), (line_request, []))[1].append(gpio_pin)
+        
+        active = self.value_active
+        values = {}
+        for line_request, gpio_pins in request_pins.values():
+            for gpio_pin, value in zip(gpio_pins, line_request.get_values(gpio_pins)):
+                values[gpio_pin] = 1 if value == active else 0
+        return values
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        self.active_low |= set(active_low)
+        changed_requests = {}
+        for gpio_pin in remove_pins:
+            line_request = self.requests.pop(gpio_pin)
+            self.parked[gpio_pin] = line_request
+            changed_requests[id(line_request)] = line_request
+        
+        added = {gpio_pin: value for gpio_pin, value in values.items() if gpio_pin not in self.requests}
+        for gpio_pin in added:
+            if gpio_pin in self.parked:
+                line_request = self.parked.pop(gpio_pin)
+                self.requests[gpio_pin] = line_request
+                changed_requests[id(line_request)] = line_request
+        
+        # Reconfigure every line of a changed request: live lines keep their
+        # current value, parked lines become inputs (no longer driven)
+        live_requests = {id(line_request) for line_request in self.requests.values()}
+        for request_id, line_request in changed_requests.items():
+            line_pins = [gpio_pin for gpio_pin, owner in self.requests.items() if owner is line_request]
+            parked_pins = [gpio_pin for gpio_pin, owner in self.parked.items() if owner is line_request]
+            if request_id not in live_requests:
+                line_request.release()
+                for gpio_pin in parked_pins:
+                    del self.parked[gpio_pin]
+                continue
+            
+            line_config = {gpio_pin: self.output_settings(gpio_pin, values[gpio_pin]) for gpio_pin in line_pins}
+            for gpio_pin in parked_pins:
+                line_config[gpio_pin] = self.gpiod.LineSettings(direction=self.direction_input)
+            line_request.reconfigure_lines(line_config)
+        
+        new = {gpio_pin: value for gpio_pin, value in added.items() if gpio_pin not in self.requests}
+        if new:
+            self.request_outputs(new)
+        
+        # The single-request fast path only holds while there is one request
+        unique_requests = {id(line_request): line_request for line_request in self.requests.values()}
+        self.line_request = None
+        if len(unique_requests) == 1 and not self.parked:
+            self.line_request = next(iter(unique_requests.values()))
+    
+    def release(self):
+        released = set()
+        for line_request in list(self.requests.values()) + list(self.parked.values()):
+            if id(line_request) not in released:
+                line_request.release()
+                released.add(id(line_request))
+        self.requests = {}
+        self.parked = {}
+        self.line_request = None
+    
+    kernel_debounce = True
+    
+    def open_inputs(self, chip_path, inputs):
+        from datetime import timedelta
+        
+        line_settings = {
+            gpio_pin: self.gpiod.LineSettings(
+                direction=self.direction_input,
+                edge_detection=self.edge_both,
+                bias=self.bias[setting(input_config, "inputs.bias")],
+                active_low=setting(input_config, "inputs.active_low"),
+                debounce_period=timedelta(milliseconds=setting(input_config, "inputs.debounce_ms"))
+            )
+            for gpio_pin, input_config in inputs.items()
+        }
+        self.input_request = self.gpiod.request_lines(
+            chip_path,
+            consumer=GPIO_CONSUMER,
+            config=line_settings
+        )
+    
+    def input_fds(self):
+        return [self.input_request.fd]
+    
+    def read_input_events(self, fd):
+        rising = self.rising_edge
+        return [
+            (event.line_offset, event.event_type == rising)
+            for event in self.input_request.read_edge_events(INPUT_EVENT_BUFFER)
+        ]
+    
+    def get_input_values(self):
+        offsets = self.input_request.offsets
+        active = self.value_active
+        return {
+            gpio_pin: value == active
+            for gpio_pin, value in zip(offsets, self.input_request.get_values(offsets))
+        }
+    
+    def release_inputs(self):
+        if self.input_request:
+            self.input_request.release()
+            self.input_request = None
+
+
+class SimulatedBackend(GpioBackend):
+    """In-memory GPIO chip for running and benchmarking without hardware"""
+    name = "simulated"
+    
+    def __init__(self):
+        self.values = {}
+        self.write_count = 0
+        self.input_values = {}
+        self.event_pipe = None
+    
+    def find_chip(self, chip_name):
+        # Any chip name is accepted, there is no hardware to look up
+        return chip_name
+    
+    def open(self, chip_path, initial_values, active_low=()):
+        # Values are logical, the polarity of a simulated line doesn't matter
+        self.values = dict(initial_values)
+    
+    def set_value(self, gpio_pin, value):
+        self.values[gpio_pin] = value
+        self.write_count += 1
+    
+    def set_values(self, values):
+        self.values.update(values)
+        self.write_count += 1
+    
+    def get_values(self):
+        return dict(self.values)
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        for gpio_pin in remove_pins:
+            del self.values[gpio_pin]
+        for gpio_pin, value in values.items():
+            self.values.setdefault(gpio_pin, value)
+    
+    def release(self):
+        self.values = {}
+    
+    kernel_debounce = True
+    
+    def open_inputs(self, chip_path, inputs):
+        # Simulated inputs stay inactive: the pipe only gives the input
+        # thread a descriptor to wait on, nothing writes to it
+        self.input_values = {gpio_pin: False for gpio_pin in inputs}
+        self.event_pipe = os.pipe()
+    
+    def input_fds(self):
+        return [self.event_pipe[0]]
+    
+    def read_input_events(self, fd):
+        os.read(fd, INPUT_EVENT_BUFFER)
+        return []
+    
+    def get_input_values(self):
+        return dict(self.input_values)
+    
+    def release_inputs(self):
+        if self.event_pipe:
+            os.close(self.event_pipe[0])
+            os.close(self.event_pipe[1])
+            self.event_pipe = None
+
+
+class ShiftRegisterBackend(GpioBackend):
+    """Chained 74HC595 shift registers driven by data, clock and latch lines
+    
+    GPIO pins are the register outputs: offset 0 is Q0 of the first register
+    (the one on the data line), offset 8 is Q0 of the second one, and so on.
+    The whole bank is kept as a bitmask; every write clocks out one complete
+    frame with batched writes to the control lines and then latches it.
+    The registers have no polarity setting, active-low outputs are inverted
+    when the frame is clocked out.
+    """
+    name = "74HC595"
+    
+    def __init__(self, lines_backend, control_chip, register):
+        self.lines = lines_backend
+        self.control_chip = control_chip
+        self.data = register["data"]
+        self.clock = register["clock"]
+        self.latch = register["latch"]
+        self.oe = register.get("oe")
+        self.bits = register["registers"] * 8
+        self.frame = 0
+        self.inverted = 0  # Active-low outputs
+        self.used = set()
+        # Control line writes, built once: data bit with clock LOW, clock HIGH
+        self.bit_writes = ({self.data: 0, self.clock: 0}, {self.data: 1, self.clock: 0})
+        self.clock_high = {self.clock: 1}
+        self.latch_high = {self.clock: 0, self.latch: 1}
+        self.latch_low = {self.latch: 0}
+    
+    def open(self, chip_path, initial_values, active_low=()):
+        control = {self.data: 0, self.clock: 0, self.latch: 0}
+        if self.oe is not None:
+            # Outputs stay disabled (OE HIGH) until the first frame is latched
+            control[self.oe] = 1
+        self.lines.open(self.control_chip, control)
+        
+        self.used = set(initial_values)
+        self.frame = 0
+        self.inverted = 0
+        for offset, value in initial_values.items():
+            if value:
+                self.frame |= 1 << offset
+        for offset in active_low:
+            self.inverted |= 1 << offset
+        self.shift_out()
+        if self.oe is not None:
+            self.lines.set_value(self.oe, 0)
+    
+    def shift_out(self):
+        """Clock out the whole frame, last register output first, and latch it"""
+        write = self.lines.set_values
+        bit_writes, clock_high, frame = self.bit_writes, self.clock_high, self.frame ^ self.inverted
+        for offset in range(self.bits - 1, -1, -1):
+            write(bit_writes[(frame >> offset) & 1])
+            write(clock_high)
+        write(self.latch_high)
+        write(self.latch_low)
+    
+    def set_value(self, gpio_pin, value):
+        self.set_values({gpio_pin: value})
+    
+    def set_values(self, values):
+        frame = self.frame
+        for gpio_pin, value in values.items():
+            if value:
+                frame |= 1 << gpio_pin
+            else:
+                frame &= ~(1 << gpio_pin)
+        if frame != self.frame:
+            self.frame = frame
+            self.shift_out()
+    
+    def get_values(self):
+        # 74HC595 outputs can't be read back
+        return {}
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        # Removed outputs were already turned off and simply stay unused
+        added = {gpio_pin: value for gpio_pin, value in values.items() if gpio_pin not in self.used}
+        self.used = set(values)
+        inverted = self.inverted
+        for offset in active_low:
+            inverted |= 1 << offset
+        if inverted != self.inverted:
+            self.inverted = inverted
+            self.shift_out()
+        if added:
+            self.set_values(added)
+    
+    def release(self):
+        self.lines.release()
+        self.used = set()
+    
+    def open_inputs(self, chip_path, inputs):
+        raise ValueError("74HC595 shift registers have no inputs")
+
+
+def create_backend(backend_name):
+    """Create the GPIO backend for the configured backend name
+    
+    Raises ImportError when gpiod is required but not installed.
+    """
+    if backend_name == "simulated":
+        return SimulatedBackend()
+    
+    import gpiod
+    
+    # Old versions without __version__ attribute are v1.x
+    version_str = getattr(gpiod, '__version__', "1")
+    if int(version_str.split('.')[0]) >= 2:
+        return GpiodV2Backend(gpiod)
+    return GpiodV1Backend(gpiod)
+
+
+def split_pin(gpio_pin, default_chip):
+    """(chip, offset) of a configured pin
+    
+    A pin is either a line offset on the default gpio_chip (5) or
+    "chip:offset" with the chip given by name, path or label
+    ("gpiochip2:3", "/dev/gpiochip2:3", "mcp23017:3").
+    """
+    if isinstance(gpio_pin, int):
+        return default_chip, gpio_pin
+    chip_name, _, offset = gpio_pin.rpartition(":")
+    return chip_name, int(offset)
+
+
+def setting(config, path):
+    """Value of a configuration key, or its default from CONFIG_DEFAULTS
+    
+    config is the object holding the key (the configuration, a section or
+    a list item), path the key's path in CONFIG_DEFAULTS.
+    """
+    return config.get(path.rpartition(".")[2], CONFIG_DEFAULTS[path])
+
+
+def unknown_keys(value, schema=CONFIG_SCHEMA, path=""):
+    """(path, closest known key) of every key the schema doesn't know
+    
+    Values of the wrong type are skipped, load_config reports them.
+    """
+    if isinstance(schema, dict) and isinstance(value, dict):
+        for key, item in value.items():
+            key_path = f"{path}.{key}" if path else key
+            if key.startswith("_"):
+                continue
+            if key not in schema:
+                matches = difflib.get_close_matches(key, schema, n=1)
+                yield key_path, matches[0] if matches else None
+            elif schema[key] is not None:
+                yield from unknown_keys(item, schema[key], key_path)
+    elif isinstance(schema, list) and isinstance(value, list):
+        for idx, item in enumerate(value):
+            yield from unknown_keys(item, schema[0], f"{path}[{idx}]")
+
+
+def compile_relays(config):
+    """Compile the relays of a validated configuration into the pin table
+    
+    Returns a tuple of RelayPin indexed by unit (entry 0 is None), so the
+    command path gets everything about a relay with one index. The
+    polarity is relay_logic, or the relay_logic of a pin_logic entry.
+    """
+    pin_logic = {}
+    for entry in config.get("pin_logic", []):
+        for gpio_pin in entry["pins"]:
+            pin_logic[gpio_pin] = entry["relay_logic"]
+    
+    relays = [None]
+    for idx, gpio_pin in enumerate(config["gpio_pins"]):
+        relays.append(RelayPin(
+            unit=idx + 1,
+            pin=gpio_pin,
+            active_low=pin_logic.get(gpio_pin, config["relay_logic"]) == "active_low",
+            bit=1 << idx
+        ))
+    return tuple(relays)
+
+
+def is_pin(gpio_pin):
+    """Check the format of a configured pin (see split_pin)"""
+    if isinstance(gpio_pin, bool):
+        return False
+    if isinstance(gpio_pin, int):
+        return gpio_pin >= 0
+    if not isinstance(gpio_pin, str):
+        return False
+    chip_name, _, offset = gpio_pin.rpartition(":")
+    return bool(chip_name) and offset.isdigit()
+
+
+def is_number(value, types=(int, float)):
+    """Check a configured number; JSON true/false are not 1/0"""
+    return isinstance(value, types) and not isinstance(value, bool)
+
+
+def is_name(value):
+    """Check a configured device name"""
+    return isinstance(value, str) and bool(value.strip())
+
+
+class ChipSet:
+    """GPIO lines spread over several chips, one backend per chip
+    
+    Pins are the configured pins (see split_pin). Each chip has one output
+    request; a write that touches several chips is split per chip and the
+    chips are written concurrently, so a slow I2C expander does not hold up
+    the SoC chip.
+    """
+    
+    def __init__(self, backend_name, default_chip, shift_registers=()):
+        self.backend_name = backend_name
+        self.default_chip = default_chip
+        self.shift_registers = {register["name"]: register for register in shift_registers}
+        # Created up front so a missing gpiod module is reported in onStart;
+        # it resolves chip names and drives the first chip that is used
+        self.first = create_backend(backend_name)
+        self.spare = self.first
+        self.name = self.first.name
+        self.kernel_debounce = self.first.kernel_debounce
+        self.paths = {}  # Chip name -> device path
+        self.chips = {}  # Device path -> backend
+        self.output_chips = set()  # Device paths with requested outputs
+        self.route = {}  # Output pin -> (backend, offset)
+        self.input_route = {}  # Input fd -> (backend, offset -> input pin)
+        self.input_chips = []  # (backend, offset -> input pin) per chip with inputs
+        self.readback = []  # (backend, offset -> output pin) per chip with outputs
+        self.single = None  # The backend, while all outputs are offsets on one chip
+        self.pool = None
+    
+    def backend_for(self, chip_name):
+        """Device path and backend of a chip, created on first use"""
+        chip_path = self.paths.get(chip_name)
+        if chip_path is None:
+            # Shift register banks are addressed by their name
+            if chip_name in self.shift_registers:
+                chip_path = chip_name
+            else:
+                chip_path = self.first.find_chip(chip_name)
+            self.paths[chip_name] = chip_path
+        
+        backend = self.chips.get(chip_path)
+        if backend is None:
+            if chip_path in self.shift_registers:
+                register = self.shift_registers[chip_path]
+                backend = ShiftRegisterBackend(
+                    create_backend(self.backend_name),
+                    self.first.find_chip(register.get("chip", self.default_chip)),
+                    register
+                )
+            else:
+                backend = self.spare or create_backend(self.backend_name)
+                self.spare = None
+            self.chips[chip_path] = backend
+        return chip_path, backend
+    
+    def split(self, values):
+        """Split pin -> value into chip path -> (backend, offset -> value)"""
+        chip_values = {}
+        for gpio_pin, value in values.items():
+            chip_name, offset = split_pin(gpio_pin, self.default_chip)
+            chip_path, backend = self.backend_for(chip_name)
+            chip_values.setdefault(chip_path, (backend, {}))[1][offset] = value
+        return chip_values
+    
+    def update_route(self, gpio_pins):
+        self.route = {}
+        readback = {}
+        for gpio_pin in gpio_pins:
+            chip_name, offset = split_pin(gpio_pin, self.default_chip)
+            backend = self.backend_for(chip_name)[1]
+            self.route[gpio_pin] = (backend, offset)
+            readback.setdefault(id(backend), (backend, {}))[1][offset] = gpio_pin
+        self.readback = list(readback.values())
+        
+        # One chip with plain offsets: the plugin writes to its backend directly
+        backends = {id(backend) for backend, offset in self.route.values()}
+        self.single = None
+        if len(backends) == 1 and all(isinstance(gpio_pin, int) for gpio_pin in self.route):
+            self.single = next(iter(self.route.values()))[0]
+        if len(self.output_chips) > 1 and self.pool is None:
+            self.pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="DomoticzRPIGPIO chip")
+    
+    def split_active_low(self, active_low):
+        """Split active-low pins into chip path -> set of offsets"""
+        return {
+            chip_path: set(offsets)
+            for chip_path, (backend, offsets) in self.split(dict.fromkeys(active_low, 1)).items()
+        }
+    
+    def open(self, initial_values, active_low=()):
+        """Request all output lines, one request per chip"""
+        chip_active_low = self.split_active_low(active_low)
+        for chip_path, (backend, chip_values) in self.split(initial_values).items():
+            backend.open(chip_path, chip_values, chip_active_low.get(chip_path, ()))
+            self.output_chips.add(chip_path)
+        self.update_route(initial_values)
+    
+    def set_value(self, gpio_pin, value):
+        backend, offset = self.route[gpio_pin]
+        backend.set_value(offset, value)
+    
+    def set_values(self, values):
+        writes = {}
+        for gpio_pin, value in values.items():
+            backend, offset = self.route[gpio_pin]
+            writes.setdefault(id(backend), (backend, {}))[1][offset] = value
+        
+        writes = list(writes.values())
+        if len(writes) == 1:
+            backend, chip_values = writes[0]
+            backend.set_values(chip_values)
+            return
+        
+        # Other chips are written by the pool while this thread writes the first
+        futures = [self.pool.submit(backend.set_values, chip_values) for backend, chip_values in writes[1:]]
+        backend, chip_values = writes[0]
+        backend.set_values(chip_values)
+        for future in futures:
+            future.result()
+    
+    def get_values(self):
+        """Read back every output line (pin -> level), one read per chip"""
+        values = {}
+        for backend, offsets in self.readback:
+            for offset, value in backend.get_values().items():
+                values[offsets[offset]] = value
+        return values
+    
+    def update_lines(self, values, remove_pins, active_low=()):
+        """Request added and give up removed lines, per chip (config reload)"""
+        chip_active_low = self.split_active_low(active_low)
+        removed = {}
+        for gpio_pin in remove_pins:
+            chip_name, offset = split_pin(gpio_pin, self.default_chip)
+            removed.setdefault(self.backend_for(chip_name)[0], []).append(offset)
+        
+        chip_values = self.split(values)
+        for chip_path in set(chip_values) | set(removed):
+            backend = self.chips[chip_path]
+            offset_values = chip_values.get(chip_path, (backend, {}))[1]
+            if chip_path in self.output_chips:
+                backend.update_lines(offset_values, removed.get(chip_path, []), chip_active_low.get(chip_path, ()))
+            elif offset_values:
+                backend.open(chip_path, offset_values, chip_active_low.get(chip_path, ()))
+                self.output_chips.add(chip_path)
+        self.update_route(values)
+    
+    def release(self):
+        for chip_path in self.output_chips:
+            self.chips[chip_path].release()
+        self.output_chips = set()
+        self.route = {}
+        self.readback = []
+        self.single = None
+        if self.pool:
+            self.pool.shutdown()
+            self.pool = None
+    
+    def open_inputs(self, inputs):
+        """Request input lines (input pin -> input config), per chip"""
+        self.input_route = {}
+        self.input_chips = []
+        for chip_path, (backend, chip_inputs) in self.split(inputs).items():
+            backend.open_inputs(chip_path, chip_inputs)
+            offsets = {}
+            for gpio_pin in inputs:
+                chip_name, offset = split_pin(gpio_pin, self.default_chip)
+                if self.backend_for(chip_name)[1] is backend:
+                    offsets[offset] = gpio_pin
+            self.input_chips.append((backend, offsets))
+            for fd in backend.input_fds():
+                self.input_route[fd] = (backend, offsets)
+    
+    def input_fds(self):
+        return list(self.input_route)
+    
+    def read_input_events(self, fd):
+        backend, offsets = self.input_route[fd]
+        return [(offsets[offset], active) for offset, active in backend.read_input_events(fd)]
+    
+    def get_input_values(self):
+        states = {}
+        for backend, offsets in self.input_chips:
+            for offset, active in backend.get_input_values().items():
+                states[offsets[offset]] = active
+        return states
+    
+    def release_inputs(self):
+        for backend, offsets in self.input_chips:
+            backend.release_inputs()
+        self.input_route = {}
+        self.input_chips = []
+
+
+class CommandQueue:
+    """Bounded queue of pending commands, coalesced per unit
+    
+    A new command for a unit that is already pending replaces the old one
+    and moves to the end, so the order of the remaining commands is kept.
+    Device updates of relays switched by other threads are queued too, as
+    one mask of changed relays.
+    """
+    
+    def __init__(self, size, overflow):
+        self.size = size
+        self.overflow = overflow
+        self.pending = {}
+        self.updates = 0
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def put(self, unit_num, command):
+        """Queue a command; returns False if it was dropped"""
+        with self.condition:
+            while True:
+                if unit_num in self.pending:
+                    del self.pending[unit_num]
+                    break
+                if len(self.pending) < self.size:
+                    break
+                if self.overflow == "drop_newest":
+                    return False
+                if self.overflow == "drop_oldest":
+                    del self.pending[next(iter(self.pending))]
+                    break
+                # "block": wait for the worker to take the pending batch
+                self.condition.wait()
+            
+            self.pending[unit_num] = command
+            self.condition.notify_all()
+            return True
+    
+    def put_updates(self, changed):
+        """Queue the device updates of relays switched elsewhere (bitmask)"""
+        with self.condition:
+            self.updates |= changed
+            self.condition.notify_all()
+    
+    def take(self):
+        """Wait for pending commands or updates and take all of them
+        
+        Returns (commands, changed mask), or None once the queue is closed
+        and empty.
+        """
+        with self.condition:
+            while not self.pending and not self.updates and not self.closed:
+                self.condition.wait()
+            if not self.pending and not self.updates:
+                return None
+            pending, self.pending = self.pending, {}
+            updates, self.updates = self.updates, 0
+            self.condition.notify_all()
+            return pending, updates
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class TimerScheduler:
+    """Delayed commands for all units, run by a single thread
+    
+    Timers are kept in a heap ordered by due time. Each unit has at most one
+    timer; scheduling again replaces it and replaced or cancelled entries are
+    skipped when they reach the top. Timers that are due within the same
+    resolution window are handed to the callback together, as one batch.
+    """
+    
+    def __init__(self, callback, errors, resolution=0.001):
+        self.callback = callback
+        self.errors = errors  # ErrorLog; a failing callback must not stop the thread
+        self.resolution = resolution
+        self.heap = []
+        self.timers = {}  # unit -> current heap entry
+        self.sequence = itertools.count()
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def schedule(self, unit_num, command, delay, replace=True):
+        """Run command for unit_num after delay seconds"""
+        with self.condition:
+            if not replace and unit_num in self.timers:
+                return
+            entry = (time.monotonic() + delay, next(self.sequence), unit_num, command)
+            self.timers[unit_num] = entry
+            heapq.heappush(self.heap, entry)
+            if self.heap[0] is entry:
+                self.condition.notify()
+    
+    def cancel(self, unit_num):
+        with self.condition:
+            self.timers.pop(unit_num, None)
+    
+    def run(self):
+        """Scheduler thread main loop"""
+        heap = self.heap
+        while True:
+            with self.condition:
+                while not self.closed:
+                    # Drop replaced and cancelled entries
+                    while heap and self.timers.get(heap[0][2]) is not heap[0]:
+                        heapq.heappop(heap)
+                    if not heap:
+                        self.condition.wait()
+                        continue
+                    delay = heap[0][0] - time.monotonic()
+                    if delay <= self.resolution:
+                        break
+                    self.condition.wait(delay)
+                if self.closed:
+                    return
+                
+                due_time = time.monotonic() + self.resolution
+                due = {}
+                while heap and heap[0][0] <= due_time:
+                    entry = heapq.heappop(heap)
+                    if self.timers.get(entry[2]) is entry:
+                        del self.timers[entry[2]]
+                        due[entry[2]] = entry[3]
+            
+            if due:
+                try:
+                    self.callback(due)
+                except Exception as e:
+                    self.errors.error("timers", "Error running timers of Units %s: %s", list(due), e)
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class TimeProportioner:
+    """Time-proportioning outputs, run by a single thread
+    
+    A unit with duty d is ON for d * cycle_s of every cycle. All units share
+    cycles aligned to multiples of cycle_s (monotonic clock), so ON edges
+    fall together at the cycle start and are handed to the callback as one
+    batch, like OFF edges of units with the same duty. Each unit has one
+    pending evaluation in a heap, at its next edge; the thread only wakes
+    for edges, however many units there are and whatever the cycle length.
+    
+    An ON period shorter than min_on_s is skipped and an OFF period shorter
+    than min_off_s is dropped (the relay stays ON); a setpoint change never
+    switches a relay before its minimum on/off time has passed.
+    """
+    
+    def __init__(self, callback, errors, cycle_s, min_on_s=0, min_off_s=0, resolution=PROPORTIONING_RESOLUTION):
+        self.callback = callback
+        self.errors = errors  # ErrorLog; a failing callback must not stop the thread
+        self.cycle = cycle_s
+        self.min_on = min_on_s
+        self.min_off = min_off_s
+        self.resolution = resolution
+        self.duty = {}  # unit -> duty, 0.0 - 1.0
+        self.state = {}  # unit -> (ON, time of the last edge)
+        self.heap = []
+        self.pending = {}  # unit -> current heap entry
+        self.closed = False
+        self.condition = threading.Condition()
+    
+    def set_duty(self, unit_num, duty, on=None):
+        """Set the duty of unit_num; on is the relay state when the unit is new"""
+        with self.condition:
+            self.duty[unit_num] = duty
+            if unit_num not in self.state:
+                self.state[unit_num] = (bool(on), float("-inf"))
+            self.push(unit_num, time.monotonic())
+    
+    def remove(self, unit_num):
+        with self.condition:
+            self.duty.pop(unit_num, None)
+            self.state.pop(unit_num, None)
+            self.pending.pop(unit_num, None)
+    
+    def push(self, unit_num, due):
+        entry = (due, unit_num)
+        self.pending[unit_num] = entry
+        heapq.heappush(self.heap, entry)
+        if self.heap[0] is entry:
+            self.condition.notify()
+    
+    def on_time(self, duty):
+        """Seconds ON per cycle, after the minimum on/off times"""
+        on_time = duty * self.cycle
+        if on_time < max(self.min_on, self.resolution):
+            return 0
+        if self.cycle - on_time < max(self.min_off, self.resolution):
+            return self.cycle
+        return on_time
+    
+    def evaluate(self, unit_num, now):
+        """Command for unit_num at now (or None) and the time of its next edge"""
+        cycle_start = (now + self.resolution) // self.cycle * self.cycle
+        on_time = self.on_time(self.duty[unit_num])
+        want = now - cycle_start + self.resolution < on_time
+        on, since = self.state[unit_num]
+        
+        command = None
+        if want != on:
+            hold_until = since + (self.min_on if on else self.min_off)
+            if now < hold_until:
+                return None, hold_until
+            self.state[unit_num] = (want, now)
+            on = want
+            command = "On" if on else "Off"
+        
+        if on:
+            next_edge = cycle_start + on_time if on_time < self.cycle else None
+        else:
+            next_edge = cycle_start + self.cycle if on_time > 0 else None
+        return command, next_edge
+    
+    def run(self):
+        """Proportioning thread main loop"""
+        heap = self.heap
+        while True:
+            with self.condition:
+                while not self.closed:
+                    # Drop replaced and removed entries
+                    while heap and self.pending.get(heap[0][1]) is not heap[0]:
+                        heapq.heappop(heap)
+                    if not heap:
+                        self.condition.wait()
+                        continue
+                    delay = heap[0][0] - time.monotonic()
+                    if delay <= self.resolution:
+                        break
+                    self.condition.wait(delay)
+                if self.closed:
+                    return
+                
+                now = time.monotonic()
+                commands = {}
+                while heap and heap[0][0] <= now + self.resolution:
+                    entry = heapq.heappop(heap)
+                    due, unit_num = entry
+                    if self.pending.get(unit_num) is not entry:
+                        continue
+                    del self.pending[unit_num]
+                    command, next_edge = self.evaluate(unit_num, max(due, now))
+                    if command:
+                        commands[unit_num] = command
+                    if next_edge is not None:
+                        self.push(unit_num, next_edge)
+            
+            if commands:
+                try:
+                    self.callback(commands)
+                except Exception as e:
+                    self.errors.error("proportioning", "Error switching time-proportioned Units %s: %s",
+                                      list(commands), e)
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class SensorPoller:
+    """Periodic sensor reads, run by one thread with a small read pool
+    
+    sensors maps unit -> (file, scale, threshold). All files are read
+    concurrently on the pool, so a round takes as long as the slowest read
+    instead of the sum of them (a DS18B20 conversion takes up to 750 ms).
+    With bulk conversion, all probes of the 1-Wire bus masters convert at
+    once (therm_bulk_read) and the reads only fetch the results.
+    
+    The latest value of every sensor is cached with its read time. The
+    callback gets unit -> value (None for a failed read) of the sensors
+    whose value moved by at least their threshold since the value last
+    reported, or that were last reported report_interval_s ago, and
+    unit -> exception of the reads that failed.
+    """
+    
+    def __init__(self, sensors, callback, interval_s, report_interval_s, workers, bulk_triggers=()):
+        self.sensors = sensors
+        self.callback = callback
+        self.interval = interval_s
+        self.report_interval = report_interval_s
+        self.workers = min(workers, len(sensors))
+        self.bulk_triggers = list(bulk_triggers)
+        self.cache = {}  # unit -> (value, monotonic time of the read)
+        self.reported = {}  # unit -> (value, monotonic time it was reported)
+        self.stop_event = threading.Event()
+    
+    @staticmethod
+    def read(path, scale):
+        """Value of a sensor file: w1_slave output or a plain number"""
+        with open(path) as f:
+            content = f.read()
+        if path.endswith("w1_slave"):
+            # "... crc=a5 YES\n... t=21375"
+            lines = content.splitlines()
+            if len(lines) < 2 or not lines[0].endswith("YES") or "t=" not in lines[1]:
+                raise ValueError(f"CRC check failed: {content.strip()!r}")
+            content = lines[1].rpartition("t=")[2]
+        return float(content) * scale
+    
+    @staticmethod
+    def trigger(path):
+        """Start a conversion of all probes of one bus master, returns when done"""
+        with open(path, "w") as f:
+            f.write("trigger\n")
+    
+    def poll(self, pool):
+        """Read all sensors once, report the values that changed"""
+        if self.bulk_triggers:
+            for future in [pool.submit(self.trigger, path) for path in self.bulk_triggers]:
+                try:
+                    future.result()
+                except OSError:
+                    pass  # Probes are still read, each converting on its own
+        
+        futures = {
+            unit_num: pool.submit(self.read, path, scale)
+            for unit_num, (path, scale, threshold) in self.sensors.items()
+        }
+        now = time.monotonic()
+        updates = {}
+        errors = {}
+        for unit_num, future in futures.items():
+            try:
+                value = future.result()
+            except (OSError, ValueError) as e:
+                value = None
+                errors[unit_num] = e
+                self.cache.pop(unit_num, None)
+            else:
+                self.cache[unit_num] = (value, now)
+            
+            reported = self.reported.get(unit_num)
+            if reported is None or now - reported[1] >= self.report_interval or \
+                    (value is None) != (reported[0] is None) or \
+                    (value is not None and abs(value - reported[0]) >= self.sensors[unit_num][2]):
+                self.reported[unit_num] = (value, now)
+                updates[unit_num] = value
+        
+        if updates or errors:
+            self.callback(updates, errors)
+    
+    def run(self):
+        """Poller thread main loop"""
+        with concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="DomoticzRPIGPIO sensor") as pool:
+            while not self.stop_event.is_set():
+                start = time.monotonic()
+                self.poll(pool)
+                self.stop_event.wait(max(0, self.interval - (time.monotonic() - start)))
+    
+    def close(self):
+        self.stop_event.set()
+
+
+class TraceRecorder:
+    """Opt-in trace of commands and GPIO writes, replayed by replay_trace.py
+    
+    JSON lines, appended to the file. Every plugin start writes a header
+    with the configuration and the initial GPIO levels, then one compact
+    record per event, t being seconds since the header (monotonic clock):
+    
+      [t, "c", unit, command, level, hue]   onCommand
+      [t, "s", request]                     control socket request
+      [t, "w", [[pin, value], ...]]         GPIO write
+    
+    Records are buffered; the file is flushed on heartbeat and on close.
+    """
+    
+    def __init__(self, path, config, levels):
+        self.path = path
+        self.file = open(path, "a")
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+        self.append({"trace": TRACE_VERSION, "time": time.time(), "config": config, "levels": list(levels.items())})
+    
+    def append(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+    
+    def command(self, unit_num, command, level, hue):
+        self.append([round(time.monotonic() - self.start, 6), "c", unit_num, command, level, hue])
+    
+    def request(self, request):
+        self.append([round(time.monotonic() - self.start, 6), "s", request.strip()])
+    
+    def writes(self, values):
+        self.append([round(time.monotonic() - self.start, 6), "w", list(values.items())])
+    
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+    
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class StateJournal:
+    """Relay states and pending timers in a small binary file
+    
+    The file holds two fixed-size slots that are written alternately, each
+    with a sequence number and a CRC, so a crash or power loss while writing
+    can only damage the older copy. Changes just mark the journal dirty; the
+    writer thread writes at most one slot (one write and one fdatasync) per
+    sync interval, so a burst of commands costs a single write.
+    """
+    
+    def __init__(self, path, config_id, snapshot, sync_interval):
+        self.path = path
+        self.config_id = config_id
+        self.snapshot = snapshot  # () -> (relay mask, [(unit, command, deadline)])
+        self.sync_interval = sync_interval
+        self.sequence = 0
+        self.written = None
+        self.last_write = 0
+        self.fd = None
+        self.thread = None
+        self.closed = False
+        self.pending = False
+        self.condition = threading.Condition()
+    
+    def load(self):
+        """Newest valid state (relay mask, timers) of this configuration, or None"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(2 * JOURNAL_SLOT_SIZE)
+        except FileNotFoundError:
+            return None
+        
+        newest = None
+        for start in range(0, len(data) - JOURNAL_SLOT_SIZE + 1, JOURNAL_SLOT_SIZE):
+            slot = data[start:start + JOURNAL_SLOT_SIZE]
+            size = JOURNAL_HEADER.size + JOURNAL_MAX_TIMERS * JOURNAL_TIMER.size
+            if zlib.crc32(slot[:size]) != int.from_bytes(slot[size:size + 4], "little"):
+                continue
+            magic, version, timer_count, config_id, sequence, mask = JOURNAL_HEADER.unpack_from(slot)
+            if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+                continue
+            self.sequence = max(self.sequence, sequence)
+            if config_id == self.config_id and (newest is None or sequence > newest[0]):
+                timers = []
+                for idx in range(timer_count):
+                    unit_num, command, deadline_ms = JOURNAL_TIMER.unpack_from(
+                        slot, JOURNAL_HEADER.size + idx * JOURNAL_TIMER.size)
+                    if command >= JOURNAL_LEVEL:
+                        command -= JOURNAL_LEVEL
+                    else:
+                        command = JOURNAL_COMMANDS[command]
+                    timers.append((unit_num, command, deadline_ms / 1000))
+                newest = (sequence, int.from_bytes(mask, "little"), timers)
+        return newest and newest[1:]
+    
+    def start(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self.fd).st_size < 2 * JOURNAL_SLOT_SIZE:
+            os.ftruncate(self.fd, 2 * JOURNAL_SLOT_SIZE)
+        self.thread = threading.Thread(name="DomoticzRPIGPIO journal", target=self.run, daemon=True)
+        self.thread.start()
+    
+    def mark(self):
+        """Record that the state changed; cheap enough for the command path"""
+        with self.condition:
+            self.pending = True
+            self.condition.notify()
+    
+    def run(self):
+        """Writer thread: write the current state at most once per interval"""
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                # Changes during the rest of the interval go into the same write
+                while not self.closed:
+                    delay = self.last_write + self.sync_interval - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self.condition.wait(delay)
+                if self.closed:
+                    return
+                self.pending = False
+            try:
+                self.write()
+            except OSError as e:
+                Domoticz.Error(f"Error writing state journal {self.path}: {str(e)}")
+    
+    def write(self):
+        mask, timers = self.snapshot()
+        timers = sorted(timers, key=lambda timer: timer[2])[:JOURNAL_MAX_TIMERS]
+        state = (self.config_id, mask, timers)
+        if state == self.written:
+            return
+        
+        self.sequence += 1
+        slot = bytearray(JOURNAL_SLOT_SIZE)
+        JOURNAL_HEADER.pack_into(slot, 0, JOURNAL_MAGIC, JOURNAL_VERSION, len(timers),
+                                 self.config_id, self.sequence, mask.to_bytes(16, "little"))
+        for idx, (unit_num, command, deadline) in enumerate(timers):
+            if isinstance(command, int):
+                command += JOURNAL_LEVEL
+            else:
+                command = JOURNAL_COMMANDS.index(command)
+            JOURNAL_TIMER.pack_into(slot, JOURNAL_HEADER.size + idx * JOURNAL_TIMER.size,
+                                    unit_num, command, int(deadline * 1000))
+        size = JOURNAL_HEADER.size + JOURNAL_MAX_TIMERS * JOURNAL_TIMER.size
+        slot[size:size + 4] = zlib.crc32(slot[:size]).to_bytes(4, "little")
+        
+        os.pwrite(self.fd, slot, (self.sequence % 2) * JOURNAL_SLOT_SIZE)
+        os.fdatasync(self.fd)
+        self.written = state
+        self.last_write = time.monotonic()
+    
+    def close(self):
+        """Stop the writer and write the final state"""
+        if self.thread:
+            with self.condition:
+                self.closed = True
+                self.condition.notify()
+            self.thread.join(timeout=5)
+            self.thread = None
+        if self.fd is not None:
+            try:
+                self.write()
+            except OSError as e:
+                Domoticz.Error(f"Error writing state journal {self.path}: {str(e)}")
+            os.close(self.fd)
+            self.fd = None
+
+
+class ControlServer:
+    """Local Unix socket for bulk relay control without Domoticz
+    
+    Text protocol, one request per line. Masks are hex bitmasks over the
+    relay units (bit unit - 1):
+    
+      GET                        -> STATE <mask>
+      SET <mask> [<bits>]        relays selected by bits (default: all) to mask
+      ON <bits>, OFF <bits>, TOGGLE <bits>
+      UNIT <unit> ON|OFF|TOGGLE  any relay or group unit
+      UNIT <unit> <level>        selector unit to a level index
+      SUBSCRIBE                  -> STATE <mask>, then EVENT <mask> <changed>
+                                    on every change
+    
+    Requests are answered with STATE <mask> right after the GPIO write, or
+    with ERR <reason>. The handler does the relay work; this class only
+    handles the connections, on one thread.
+    """
+    
+    def __init__(self, path, mode, handler, errors):
+        self.path = path
+        self.mode = mode
+        self.handler = handler  # (request line, reply function) -> None
+        self.errors = errors  # ErrorLog; a failing request must not stop the thread
+        self.listener = None
+        self.clients = {}  # Client socket -> receive buffer
+        self.subscribers = set()
+        self.send_lock = threading.Lock()
+        self.wake = None
+        self.thread = None
+    
+    def start(self):
+        # A socket left behind by a crash would make bind() fail
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        os.chmod(self.path, self.mode)
+        self.listener.listen(8)
+        self.wake = os.pipe()
+        self.thread = threading.Thread(name="DomoticzRPIGPIO control", target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        """Server thread: accept clients and handle their requests"""
+        wake_fd = self.wake[0]
+        while True:
+            readable = select.select([self.listener, wake_fd] + list(self.clients), [], [])[0]
+            for sock in readable:
+                if sock == wake_fd:
+                    return
+                if sock is self.listener:
+                    client = self.listener.accept()[0]
+                    client.setblocking(False)
+                    self.clients[client] = bytearray()
+                    continue
+                
+                try:
+                    data = sock.recv(4096)
+                except OSError:
+                    data = b""
+                if not data:
+                    self.drop(sock)
+                    continue
+                
+                buffer = self.clients[sock]
+                buffer += data
+                while b"\n" in buffer:
+                    end = buffer.index(b"\n")
+                    request = buffer[:end].decode(errors="replace")
+                    del buffer[:end + 1]
+                    if request.strip().upper() == "SUBSCRIBE":
+                        with self.send_lock:
+                            self.subscribers.add(sock)
+                    replies = []
+                    
+                    def reply(text, sock=sock):
+                        replies.append(text)
+                        self.send(sock, text)
+                    
+                    try:
+                        self.handler(request, reply)
+                    except Exception as e:
+                        self.errors.error("control", "Error handling control request %r: %s", request.strip(), e)
+                        # The client waits for an answer to every request
+                        if not replies:
+                            self.send(sock, "ERR internal error")
+                if len(buffer) > CONTROL_MAX_LINE:
+                    self.drop(sock)
+    
+    def send(self, sock, text):
+        """Send a line to a client; called from any thread"""
+        with self.send_lock:
+            try:
+                sock.sendall(f"{text}\n".encode())
+            except OSError:
+                # Gone, or not reading what it gets: no point in buffering.
+                # The server thread sees the shutdown and drops the client.
+                self.subscribers.discard(sock)
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+    
+    def publish(self, mask, changed):
+        """Send a state change to all subscribers"""
+        if self.subscribers:
+            event = f"EVENT {mask:x} {changed:x}"
+            with self.send_lock:
+                subscribers = list(self.subscribers)
+            for sock in subscribers:
+                self.send(sock, event)
+    
+    def drop(self, sock):
+        """Close a client; only on the server thread"""
+        with self.send_lock:
+            self.subscribers.discard(sock)
+        del self.clients[sock]
+        sock.close()
+    
+    def close(self):
+        if self.thread:
+            os.write(self.wake[1], b"x")
+            self.thread.join(timeout=5)
+            self.thread = None
+        for sock in list(self.clients):
+            self.drop(sock)
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+            os.unlink(self.path)
+        if self.wake:
+            os.close(self.wake[0])
+            os.close(self.wake[1])
+            self.wake = None
+
+
+class Metrics:
+    """Always-on counters and latency histograms of the command path
+    
+    All storage is allocated up front; recording only increments list items.
+    Stages: queue (onCommand -> worker), write (GPIO write), update
+    (Devices.Update), total (onCommand -> devices updated).
+    """
+    
+    def __init__(self):
+        self.bounds_ns = [bound * 1000 for bound in LATENCY_BUCKETS_US]
+        self.buckets = [[0] * (len(self.bounds_ns) + 1) for stage in METRICS_STAGES]
+        self.sum_ns = [0] * len(METRICS_STAGES)
+        self.received_ns = [0] * MAX_UNITS  # onCommand time of pending commands
+        self.switches = [0] * MAX_UNITS
+        self.errors = [0] * MAX_UNITS
+        self.redundant = [0] * MAX_UNITS
+        self.published_count = 0
+        self.published_sum_ns = 0
+    
+    def observe(self, stage, duration_ns):
+        """Record a duration for a stage (index into METRICS_STAGES)"""
+        self.buckets[stage][bisect.bisect_left(self.bounds_ns, duration_ns)] += 1
+        self.sum_ns[stage] += duration_ns
+    
+    def finish(self, commands, now_ns):
+        """Record queue and total latency of commands received by onCommand"""
+        received_ns = self.received_ns
+        for unit_num in commands:
+            if received_ns[unit_num]:
+                self.observe(STAGE_TOTAL, now_ns - received_ns[unit_num])
+                received_ns[unit_num] = 0
+    
+    def prometheus(self, lines):
+        """Metrics in Prometheus text exposition format"""
+        out = [
+            "# HELP domoticz_gpio_latency_seconds Command path latency per stage",
+            "# TYPE domoticz_gpio_latency_seconds histogram",
+        ]
+        for stage, name in enumerate(METRICS_STAGES):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_US + ["+Inf"], self.buckets[stage]):
+                cumulative += count
+                le = bound if bound == "+Inf" else bound / 1e6
+                out.append(f'domoticz_gpio_latency_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            out.append(f'domoticz_gpio_latency_seconds_sum{{stage="{name}"}} {self.sum_ns[stage] / 1e9}')
+            out.append(f'domoticz_gpio_latency_seconds_count{{stage="{name}"}} {cumulative}')
+        
+        for metric, values, help_text in (
+            ("domoticz_gpio_switches_total", self.switches, "Relay state changes"),
+            ("domoticz_gpio_errors_total", self.errors, "Failed GPIO writes"),
+            ("domoticz_gpio_redundant_commands_total", self.redundant, "Commands that did not change the relay"),
+        ):
+            out.append(f"# HELP {metric} {help_text}")
+            out.append(f"# TYPE {metric} counter")
+            for unit_num, gpio_pin in lines.items():
+                out.append(f'{metric}{{unit="{unit_num}",pin="{gpio_pin}"}} {values[unit_num]}')
+        return "\n".join(out) + "\n"
+    
+    def json(self, lines):
+        """Metrics as a JSON document"""
+        return json.dumps({
+            "latency_us": {
+                name: {
+                    "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS_US] + ["+Inf"], self.buckets[stage])),
+                    "count": sum(self.buckets[stage]),
+                    "sum": self.sum_ns[stage] / 1000,
+                }
+                for stage, name in enumerate(METRICS_STAGES)
+            },
+            "units": {
+                unit_num: {
+                    "pin": gpio_pin,
+                    "switches": self.switches[unit_num],
+                    "errors": self.errors[unit_num],
+                    "redundant": self.redundant[unit_num],
+                }
+                for unit_num, gpio_pin in lines.items()
+            },
+        }, indent=2)
+    
+    def mean_total_ms(self):
+        """Mean total latency since the previous call (None without commands)"""
+        count = sum(self.buckets[STAGE_TOTAL])
+        sum_ns = self.sum_ns[STAGE_TOTAL]
+        if count == self.published_count:
+            return None
+        mean_ms = (sum_ns - self.published_sum_ns) / (count - self.published_count) / 1e6
+        self.published_count, self.published_sum_ns = count, sum_ns
+        return mean_ms
+
+
+class ErrorLog:
+    """Rate-limited error log
+    
+    The first error of a kind (key) is logged right away; further errors of
+    the same kind within ERROR_LOG_INTERVAL seconds are only counted and
+    reported together with the next logged one, or by flush().
+    """
+    
+    def __init__(self, interval=ERROR_LOG_INTERVAL):
+        self.interval = interval
+        self.state = {}  # key -> [time of last logged error, suppressed count]
+        self.lock = threading.Lock()
+    
+    def error(self, key, message, *args):
+        """Log an error; message is only formatted when it is logged"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.state.get(key)
+            if entry and now - entry[0] < self.interval:
+                entry[1] += 1
+                return
+            suppressed = entry[1] if entry else 0
+            self.state[key] = [now, 0]
+        
+        text = message % args if args else message
+        if suppressed:
+            text += f" ({suppressed} similar errors suppressed)"
+        Domoticz.Error(text)
+    
+    def flush(self):
+        """Report errors suppressed longer than the interval ago"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [
+                (key, entry[1]) for key, entry in self.state.items()
+                if entry[1] and now - entry[0] >= self.interval
+            ]
+            for key, suppressed in expired:
+                self.state[key] = [now, 0]
+        
+        for key, suppressed in expired:
+            Domoticz.Error(f"{suppressed} more '{key}' errors in the last {self.interval} s")
+
 
 class BasePlugin:
     enabled = False
-    chip = None
+    backend = None
     lines = {}
+    groups = {}
+    selectors = {}  # Unit -> (relay bits, mask per level, mask -> level, break seconds)
     config = {}
     plugin_path = ""
-    gpiod_version = 1  # Default to v1
-    gpiod_module = None
-    line_request = None  # For gpiod v2
+    config_file = ""  # Defaults to gpio_config.json in the plugin directory
+    relays = (None,)  # Pin table: unit -> RelayPin (see compile_relays)
+    relay_bits = 0  # Bits of all relays in the output mask
+    output_mask = 0  # Shadow register: bit (unit - 1) set = relay ON
+    command_queue = None
+    command_thread = None
+    inputs = {}  # GPIO pin -> input unit
+    input_mask = 0  # Input states: bit (unit - INPUT_UNIT_BASE) set = active
+    input_thread = None
+    input_wake = None
+    bindings = {}  # GPIO pin -> [(action, unit, pulse seconds)]
+    scheduler = None
+    scheduler_thread = None
+    auto_off = {}  # Unit -> seconds after which an ON relay turns off again
+    proportioner = None
+    proportioner_thread = None
+    proportioning = None  # (time_proportioning config, units) the proportioner runs with
+    proportioned_mask = 0  # Relays switched by the proportioner; their devices show the duty
+    sensor_poller = None
+    sensor_thread = None
+    sensors_config = None  # sensors config the poller runs with
+    config_mtime = None
+    metrics = None
+    metrics_published = 0
+    readback_due = 0
+    readback_interval = 0
+    journal = None
+    control = None
+    trace = None
+    inrush = None  # (max ON transitions per slice, slice seconds, urgent relay bits)
+    inrush_pending = 0  # Relays held back by the inrush limit, turned on in later slices
+    inrush_slice = 0.0  # Start of the current slice
+    inrush_used = 0  # ON transitions in the current slice
+    debug_enabled = False  # Mode6 = Debug
     
     def __init__(self):
+        self.gpio_lock = threading.Lock()
+        self.metrics = Metrics()
+        self.errors = ErrorLog()
         return
     
+    def debug(self, message, *args):
+        """Debug message, only formatted when debugging is enabled (Mode6)"""
+        if self.debug_enabled:
+            Domoticz.Debug(message % args if args else message)
+    
     def onStart(self):
         Domoticz.Log("Domoticz RPI GPIO plugin starting")
+        start_time = time.monotonic()
+        
+        self.debug_enabled = Parameters.get("Mode6", "Normal") == "Debug"
+        if self.debug_enabled:
+            Domoticz.Debugging(1)
         
         # Get plugin directory path
         self.plugin_path = os.path.dirname(os.path.realpath(__file__))
-        Domoticz.Log(f"Plugin path: {self.plugin_path}")
+        self.debug("Plugin path: %s", self.plugin_path)
+        if not self.config_file:
+            self.config_file = os.path.join(self.plugin_path, "gpio_config.json")
         
         # Load configuration from JSON file
         if not self.load_config():
@@ -65,34 +1991,24 @@ class BasePlugin:
             self.enabled = False
             return
         
-        # Import gpiod and detect version
+        # Select GPIO backend once; the command path only calls into it
+        backend_name = setting(self.config, "backend")
         try:
-            import gpiod
-            self.gpiod_module = gpiod
-            
-            # Detect gpiod version
-            if hasattr(gpiod, '__version__'):
-                version_str = gpiod.__version__
-                Domoticz.Log(f"Detected gpiod version: {version_str}")
-                major_version = int(version_str.split('.')[0])
-                self.gpiod_version = major_version
-            else:
-                # Old version without __version__ attribute
-                self.gpiod_version = 1
-                Domoticz.Log("Detected gpiod version: 1.x (legacy)")
-                
+            self.backend = ChipSet(backend_name, self.config["gpio_chip"], self.config.get("shift_registers", []))
+            self.debug("Using GPIO backend: %s", self.backend.name)
         except ImportError:
             Domoticz.Error("gpiod module not found! Install it with:")
             Domoticz.Error("  sudo apt install python3-libgpiod")
             Domoticz.Error("  or: sudo pip3 install gpiod --break-system-packages")
+            Domoticz.Error("  or set \"backend\": \"simulated\" in gpio_config.json")
             self.enabled = False
             return
         
         # Get configuration values
         gpio_pins = self.config.get("gpio_pins", [])
-        relay_logic = self.config.get("relay_logic", "active_low")
-        gpio_chip_name = self.config.get("gpio_chip", "gpiochip0")
-        relay_names = self.config.get("relay_names", [])
+        relay_logic = setting(self.config, "relay_logic")
+        gpio_chip_name = setting(self.config, "gpio_chip")
+        relay_groups = self.config.get("relay_groups", [])
         
         # Validate configuration
         if not gpio_pins:
@@ -100,66 +2016,117 @@ class BasePlugin:
             self.enabled = False
             return
         
-        Domoticz.Log(f"Configuration loaded:")
-        Domoticz.Log(f"  GPIO Chip: {gpio_chip_name}")
-        Domoticz.Log(f"  GPIO Pins: {gpio_pins}")
-        Domoticz.Log(f"  Relay Logic: {relay_logic}")
-        Domoticz.Log(f"  Number of relays: {len(gpio_pins)}")
-        Domoticz.Log(f"  Using gpiod API version: {self.gpiod_version}")
+        self.debug("Configuration loaded:")
+        self.debug("  GPIO Chip: %s", gpio_chip_name)
+        self.debug("  GPIO Pins: %s", gpio_pins)
+        self.debug("  Relay Logic: %s", relay_logic)
+        self.debug("  Number of relays: %d", len(gpio_pins))
+        self.debug("  Number of relay groups: %d", len(relay_groups))
         
         try:
-            # Create devices if they don't exist
-            if len(Devices) == 0:
-                Domoticz.Log("Creating relay devices...")
-                for idx, gpio_pin in enumerate(gpio_pins):
-                    unit_num = idx + 1
-                    
-                    # Get custom relay name or use default
-                    if relay_names and idx < len(relay_names):
-                        relay_name = relay_names[idx]
-                    else:
-                        relay_name = f"Relay {unit_num}"
-                    
-                    Domoticz.Device(
-                        Name=relay_name,
-                        Unit=unit_num,
-                        TypeName="Switch",
-                        Used=1
-                    ).Create()
-                    Domoticz.Log(f"Created device: {relay_name} (Unit {unit_num}, GPIO {gpio_pin})")
-            
-            # Initialize GPIO based on version
-            if self.gpiod_version >= 2:
-                self.init_gpio_v2(gpio_chip_name, gpio_pins, relay_logic)
+            self.sync_devices()
+            
+            # Read the last known state of every relay first (from the state
+            # journal, or else from Domoticz), so the lines can be requested
+            # with their final values and no relay is switched off and on
+            # again during startup
+            journal_state = self.init_journal(gpio_pins)
+            relay_units = range(1, len(gpio_pins) + 1)
+            if journal_state:
+                restore_mask = journal_state[0] & ((1 << len(gpio_pins)) - 1)
             else:
-                self.init_gpio_v1(gpio_chip_name, gpio_pins, relay_logic)
+                restore_mask = self.device_mask(relay_units)
+            
+            self.init_gpio(gpio_pins, restore_mask)
+            if "trace" in self.config:
+                self.init_trace(self.config["trace"])
+            
+            # Unit of each relay pin, for groups and timers
+            pin_units = {gpio_pin: unit_num for unit_num, gpio_pin in self.lines.items()}
+            self.init_groups(pin_units, relay_groups)
+            self.init_selectors(pin_units)
+            self.init_timers(pin_units)
+            self.init_inrush(pin_units)
+            
+            if self.config.get("inputs"):
+                self.init_inputs(self.config["inputs"])
+            self.init_bindings()
+            
+            # Start the timer scheduler
+            self.scheduler = TimerScheduler(self.timers_due, self.errors)
+            self.scheduler_thread = threading.Thread(
+                name="DomoticzRPIGPIO timers",
+                target=self.scheduler.run,
+                daemon=True
+            )
+            self.scheduler_thread.start()
+            self.init_proportioning(pin_units)
+            self.init_sensors()
+            
+            # Domoticz may have an older state, e.g. from a restored database.
+            # Reconciled once groups, selectors and time-proportioned relays
+            # are known: the dimmers of the latter keep their level
+            mask = self.output_mask
+            if journal_state:
+                changed = self.device_mask(relay_units) ^ mask
+                if changed:
+                    self.update_devices(changed, mask, switched=False)
+            self.update_group_devices(-1, mask)
+            if self.selectors:
+                self.update_selector_devices(-1, mask)
+            
+            # Timers that were pending when the plugin stopped; overdue ones run now
+            if journal_state:
+                now = time.time()
+                for unit_num, command, deadline in journal_state[1]:
+                    if unit_num in self.lines or unit_num in self.groups or unit_num in self.selectors:
+                        self.scheduler.schedule(unit_num, command, max(0, deadline - now))
+            
+            # Start the command worker
+            queue_config = self.config.get("command_queue", {})
+            if setting(queue_config, "command_queue.enabled"):
+                self.command_queue = CommandQueue(
+                    setting(queue_config, "command_queue.size"),
+                    setting(queue_config, "command_queue.overflow")
+                )
+                self.command_thread = threading.Thread(
+                    name="DomoticzRPIGPIO commands",
+                    target=self.command_worker,
+                    daemon=True
+                )
+                self.command_thread.start()
+            
+            # An empty object turns a feature on with its defaults
+            control_config = self.config.get("control_socket")
+            if control_config is not None:
+                self.control = ControlServer(
+                    os.path.join(self.plugin_path, setting(control_config, "control_socket.path")),
+                    int(setting(control_config, "control_socket.mode"), 8),
+                    self.control_request,
+                    self.errors
+                )
+                try:
+                    self.control.start()
+                except OSError as e:
+                    Domoticz.Error(f"Can't open control socket {self.control.path}: {str(e)}")
+                    self.control = None
+            
+            if self.journal:
+                try:
+                    self.journal.start()
+                    self.journal.mark()
+                except OSError as e:
+                    Domoticz.Error(f"Can't open state journal {self.journal.path}: {str(e)}")
+                    self.journal = None
             
             self.enabled = True
             
-            # Synchronize GPIO states with Domoticz device states
-            # This restores the last known state after reboot/restart
-            Domoticz.Log("Synchronizing GPIO states with Domoticz...")
-            for unit_num, line_info in self.lines.items():
-                if unit_num in Devices:
-                    device_state = Devices[unit_num].nValue
-                    gpio_pin = line_info['gpio_pin']
-                    
-                    # Restore GPIO to match Domoticz state
-                    if device_state == 1:  # Device is ON in Domoticz
-                        command = "On"
-                    else:  # Device is OFF in Domoticz
-                        command = "Off"
-                    
-                    # Set GPIO without updating Domoticz (already has correct state)
-                    if self.gpiod_version >= 2:
-                        self.set_gpio_v2_silent(gpio_pin, command, relay_logic)
-                    else:
-                        self.set_gpio_v1_silent(gpio_pin, line_info, command, relay_logic)
-                    
-                    Domoticz.Log(f"Restored Unit {unit_num} (GPIO {gpio_pin}) to state: {command}")
+            if self.debug_enabled:
+                restored = [unit_num for unit_num in self.lines if restore_mask & (1 << (unit_num - 1))]
+                self.debug("Restored Units %s to state: On, all other relays Off", restored)
             
-            Domoticz.Log("Plugin started successfully")
-            Domoticz.Log(f"Active relay logic: {relay_logic}")
+            Domoticz.Log(f"Plugin started successfully in {(time.monotonic() - start_time) * 1000:.1f} ms "
+                         f"({len(gpio_pins)} relays, {self.backend.name}, {relay_logic})")
             
         except Exception as e:
             Domoticz.Error(f"Failed to initialize GPIO: {str(e)}")
@@ -167,226 +2134,1231 @@ class BasePlugin:
             Domoticz.Error(f"Traceback: {traceback.format_exc()}")
             self.enabled = False
     
-    def init_gpio_v1(self, gpio_chip_name, gpio_pins, relay_logic):
-        """Initialize GPIO using gpiod v1.x API"""
-        Domoticz.Log("Initializing GPIO with v1.x API")
+    def device_specs(self):
+        """Device of every configured unit: unit -> (name, name configured, type)
+        
+        Units without a configured name get a default name when they are
+        created; a name changed in Domoticz is only overwritten when the
+        configured name changes (see sync_devices).
+        """
+        switch = {"Type": 244, "Subtype": 73}
+        dimmer = dict(switch, Switchtype=7)
+        proportioned_pins = self.config.get("time_proportioning", {}).get("pins", [])
+        specs = {}
+        relay_names = self.config.get("relay_names", [])
+        for idx, gpio_pin in enumerate(self.config["gpio_pins"]):
+            relay_type = dimmer if gpio_pin in proportioned_pins else switch
+            if idx < len(relay_names):
+                specs[idx + 1] = (relay_names[idx], True, relay_type)
+            else:
+                specs[idx + 1] = (f"Relay {idx + 1}", False, relay_type)
+        
+        for idx, input_config in enumerate(self.config.get("inputs", [])):
+            specs[INPUT_UNIT_BASE + idx] = (
+                input_config.get("name", f"Input {idx + 1}"),
+                "name" in input_config,
+                dict(switch, Switchtype=INPUT_SWITCH_TYPES[setting(input_config, "inputs.type")])
+            )
+        
+        if self.config.get("metrics", {}).get("domoticz_sensors", False):
+            for offset, name, unit_label in ((0, "GPIO Command Latency", "ms"), (1, "GPIO Switch Cycles", "cycles")):
+                specs[METRICS_UNIT_BASE + offset] = (
+                    name, True, {"Type": 243, "Subtype": 31, "Options": {"Custom": f"1;{unit_label}"}}
+                )
+        
+        for idx, group in enumerate(self.config.get("relay_groups", [])):
+            specs[GROUP_UNIT_BASE + idx] = (group["name"], True, switch)
+        
+        for idx, sensor in enumerate(self.config.get("sensors", {}).get("devices", [])):
+            if setting(sensor, "sensors.devices.type") == "temperature":
+                sensor_type = {"Type": 80, "Subtype": 5}
+            else:
+                sensor_type = {"Type": 243, "Subtype": 31, "Options": {"Custom": f"1;{sensor.get('unit', '')}"}}
+            specs[SENSOR_UNIT_BASE + idx] = (sensor["name"], True, sensor_type)
+        
+        for idx, selector in enumerate(self.config.get("selectors", [])):
+            level_names = [level["name"] for level in selector["levels"]]
+            specs[SELECTOR_UNIT_BASE + idx] = (selector["name"], True, {
+                "Type": 244,
+                "Subtype": 62,
+                "Switchtype": 18,
+                "Options": {
+                    "LevelNames": "|".join(level_names),
+                    "LevelOffHidden": "false",
+                    # Buttons for a few levels, a drop-down list for more
+                    "SelectorStyle": "0" if len(level_names) <= 5 else "1",
+                },
+            })
+        return specs
+    
+    def sync_devices(self):
+        """Bring the Domoticz devices in line with the configuration
+        
+        Only missing devices are created and only devices whose configured
+        name or type changed are updated; devices of units that are no
+        longer configured are marked (timed out) but kept with their
+        history.
+        
+        A configured name is applied when it changes in gpio_config.json,
+        not on every start: the names last applied are kept in the
+        hardware's configuration, so names changed in Domoticz stay. The
+        relays under time_proportioning are kept the same way, so a relay
+        is only turned back from a dimmer into an On/Off switch when it
+        leaves time_proportioning, and a switch type chosen in Domoticz
+        stays otherwise.
+        """
+        specs = self.device_specs()
+        configuration = Domoticz.Configuration()
+        applied_names = configuration.get("names")
+        # Without a record (first start of this version) the current names
+        # are taken as applied rather than overwriting renamed devices
+        first_sync = applied_names is None
+        applied_names = applied_names or {}
+        names = {}
+        proportioned_pins = self.config.get("time_proportioning", {}).get("pins", [])
+        proportioned = [idx + 1 for idx, gpio_pin in enumerate(self.config["gpio_pins"])
+                        if gpio_pin in proportioned_pins]
+        left_proportioning = set(configuration.get("proportioned", [])) - set(proportioned)
+        created, updated = [], []
+        for unit_num, (name, name_configured, device_type) in specs.items():
+            if name_configured:
+                names[str(unit_num)] = name
+            if unit_num not in Devices:
+                Domoticz.Device(Name=name, Unit=unit_num, Used=1, **device_type).Create()
+                created.append(unit_num)
+                continue
+            
+            device = Devices[unit_num]
+            changes = {}
+            if name_configured and not first_sync and applied_names.get(str(unit_num)) != name and \
+                    device.Name != name:
+                changes["Name"] = name
+            if device.Type != device_type["Type"] or device.SubType != device_type["Subtype"] or \
+                    device.SwitchType != device_type.get("Switchtype", device.SwitchType) or \
+                    device.Options != device_type.get("Options", device.Options):
+                changes.update(device_type)
+            n_value, s_value = device.nValue, device.sValue
+            if unit_num in left_proportioning and device.SwitchType == 7:
+                # The level is no state of a switch; the relay state is set
+                # again once the relays are restored (or by init_proportioning)
+                changes["Switchtype"] = 0
+                n_value, s_value = (1, "On") if device.nValue else (0, "Off")
+            if device.TimedOut:
+                changes["TimedOut"] = 0
+            if changes:
+                device.Update(nValue=n_value, sValue=s_value, **changes)
+                updated.append(unit_num)
+        
+        if names != applied_names or first_sync or configuration.get("proportioned", []) != proportioned:
+            configuration["names"] = names
+            configuration["proportioned"] = proportioned
+            Domoticz.Configuration(configuration)
+        
+        orphans = [unit_num for unit_num in Devices if unit_num not in specs]
+        for unit_num in orphans:
+            device = Devices[unit_num]
+            if not device.TimedOut:
+                device.Update(nValue=device.nValue, sValue=device.sValue, TimedOut=1)
+                Domoticz.Error(f"Unit {unit_num} ({device.Name}) is not in gpio_config.json any more; "
+                               f"delete the device in Domoticz if it is no longer needed")
+        
+        if created or updated:
+            Domoticz.Log(f"Devices: created Units {created}, updated Units {updated}")
+        self.debug("Devices: %d configured, %d created, %d updated, %d not configured",
+                   len(specs), len(created), len(updated), len(orphans))
+    
+    def init_groups(self, pin_units, relay_groups):
+        """Group bitmasks over the relay units"""
+        self.groups = {}
+        for idx, group in enumerate(relay_groups):
+            group_mask = 0
+            for gpio_pin in group["pins"]:
+                group_mask |= 1 << (pin_units[gpio_pin] - 1)
+            self.groups[GROUP_UNIT_BASE + idx] = group_mask
+    
+    def init_selectors(self, pin_units):
+        """Lookup tables of the selectors, built once per configuration"""
+        self.selectors = {}
+        for idx, selector in enumerate(self.config.get("selectors", [])):
+            bits = 0
+            for gpio_pin in selector["pins"]:
+                bits |= 1 << (pin_units[gpio_pin] - 1)
+            
+            level_masks = []
+            for level in selector["levels"]:
+                level_mask = 0
+                for gpio_pin in level["pins"]:
+                    level_mask |= 1 << (pin_units[gpio_pin] - 1)
+                level_masks.append(level_mask)
+            
+            self.selectors[SELECTOR_UNIT_BASE + idx] = (
+                bits,
+                level_masks,
+                {level_mask: level for level, level_mask in enumerate(level_masks)},
+                setting(selector, "selectors.break_before_make_ms") / 1000
+            )
+    
+    def init_timers(self, pin_units):
+        """Pulse/auto-off duration per relay unit"""
+        self.auto_off = {}
+        for relay_timer in self.config.get("relay_timers", []):
+            unit_num = pin_units[relay_timer["pin"]]
+            if "pulse_ms" in relay_timer:
+                self.auto_off[unit_num] = relay_timer["pulse_ms"] / 1000
+            else:
+                self.auto_off[unit_num] = relay_timer["auto_off_s"]
+    
+    def init_inrush(self, pin_units):
+        """Limit of simultaneous ON transitions, from the inrush settings"""
+        inrush_config = self.config.get("inrush")
+        if inrush_config is None:
+            self.inrush = None
+            # Nothing is held back any more: release what is still waiting
+            if self.inrush_pending:
+                self.scheduler.schedule(INRUSH_TIMER, None, 0)
+            return
+        
+        urgent_bits = 0
+        for gpio_pin in inrush_config.get("urgent_pins", []):
+            urgent_bits |= 1 << (pin_units[gpio_pin] - 1)
+        self.inrush = (inrush_config["max_on"], setting(inrush_config, "inrush.spacing_ms") / 1000, urgent_bits)
+        self.inrush_pending &= (1 << len(self.lines)) - 1
+    
+    def limit_inrush(self, old_mask, new_mask):
+        """Relay mask with the ON transitions the current slice allows
+        
+        Called with gpio_lock held. Relays beyond the limit stay OFF and
+        wait in inrush_pending; a scheduler timer applies them at the start
+        of the next slice, again up to the limit. OFF transitions and urgent
+        relays are never held back and don't count against the limit.
+        """
+        if not self.inrush:
+            self.inrush_pending = 0
+            return new_mask
+        
+        max_on, spacing, urgent_bits = self.inrush
+        now = time.monotonic()
+        if now - self.inrush_slice >= spacing:
+            self.inrush_slice = now
+            self.inrush_used = 0
+        
+        # Lowest units first, as many as the slice has left
+        waiting = new_mask & ~old_mask & ~urgent_bits
+        for _ in range(max_on - self.inrush_used):
+            if not waiting:
+                break
+            waiting &= waiting - 1
+            self.inrush_used += 1
+        
+        if waiting:
+            self.scheduler.schedule(INRUSH_TIMER, None, self.inrush_slice + spacing - now)
+        elif self.inrush_pending:
+            self.scheduler.cancel(INRUSH_TIMER)
+        self.inrush_pending = waiting
+        return new_mask & ~waiting
+    
+    def timers_due(self, due):
+        """Scheduler callback: apply due timers and the next inrush slice"""
+        due.pop(INRUSH_TIMER, None)
+        self.apply_commands(due)
+    
+    def init_proportioning(self, pin_units):
+        """Start the time-proportioning thread, or restart it if its relays changed
+        
+        The duty of each relay is the level of its dimmer device, so it is
+        kept across restarts and reloads by Domoticz.
+        """
+        proportioning_config = self.config.get("time_proportioning")
+        units = []
+        if proportioning_config is not None:
+            units = sorted(pin_units[gpio_pin] for gpio_pin in proportioning_config["pins"])
+        if (proportioning_config, units) == self.proportioning:
+            return
+        
+        old_units = self.proportioning[1] if self.proportioning else []
+        self.stop_proportioning()
+        # Relays taken out are switches again (see sync_devices) and show
+        # the state they were left in
+        left_mask = 0
+        for unit_num in old_units:
+            if unit_num not in units:
+                left_mask |= 1 << (unit_num - 1)
+        if left_mask:
+            self.update_devices(left_mask, self.output_mask, switched=False)
+        if not units:
+            return
+        
+        self.proportioner = TimeProportioner(
+            self.apply_commands,
+            self.errors,
+            proportioning_config["cycle_s"],
+            setting(proportioning_config, "time_proportioning.min_on_s"),
+            setting(proportioning_config, "time_proportioning.min_off_s")
+        )
+        for unit_num in units:
+            self.proportioned_mask |= 1 << (unit_num - 1)
+            self.proportioner.set_duty(unit_num, self.device_level(unit_num) / 100,
+                                       self.output_mask & (1 << (unit_num - 1)))
+        self.proportioning = (proportioning_config, units)
+        
+        self.proportioner_thread = threading.Thread(
+            name="DomoticzRPIGPIO proportioning",
+            target=self.proportioner.run,
+            daemon=True
+        )
+        self.proportioner_thread.start()
+        self.debug("Time-proportioning Units %s, cycle %s s", units, proportioning_config["cycle_s"])
+    
+    def stop_proportioning(self):
+        """Stop the time-proportioning thread; relays keep their current state"""
+        if self.proportioner_thread:
+            self.proportioner.close()
+            self.proportioner_thread.join(timeout=5)
+            self.proportioner_thread = None
+        self.proportioner = None
+        self.proportioning = None
+        self.proportioned_mask = 0
+    
+    def device_level(self, unit_num):
+        """Level (0-100) of a dimmer device, 0 when it is off"""
+        if unit_num in Devices and Devices[unit_num].nValue and Devices[unit_num].sValue.isdigit():
+            return int(Devices[unit_num].sValue)
+        return 0
+    
+    def set_duty(self, unit_num, command, level):
+        """Dimmer command of a time-proportioned relay: change its duty"""
+        device = Devices[unit_num] if unit_num in Devices else None
+        last_level = int(device.sValue) if device and device.sValue.isdigit() else 0
+        if command == "Set Level":
+            level = min(max(level, 0), 100)
+            n_value, s_value = (2 if level else 0), str(level or last_level)
+        elif command == "On":
+            # Back to the last level, full duty if there is none
+            level = last_level or 100
+            n_value, s_value = 2, str(level)
+        elif command == "Off":
+            level = 0
+            n_value, s_value = 0, str(last_level)
+        else:
+            self.errors.error("command", "Unsupported command for Unit %d: %s", unit_num, command)
+            return
+        
+        self.proportioner.set_duty(unit_num, level / 100)
+        if device:
+            device.Update(nValue=n_value, sValue=s_value)
+        self.debug("Unit %d duty set to %d%%", unit_num, level)
+    
+    def init_sensors(self):
+        """Start the sensor poller, or restart it if the sensors changed"""
+        sensors_config = self.config.get("sensors")
+        if sensors_config == self.sensors_config:
+            return
+        
+        self.stop_sensors()
+        if not sensors_config or not sensors_config.get("devices"):
+            return
+        
+        bus_path = setting(sensors_config, "sensors.bus_path")
+        sensors = {}
+        for idx, sensor in enumerate(sensors_config["devices"]):
+            if "id" in sensor:
+                # Newer kernels have a plain temperature file, which also
+                # returns the result of a bulk conversion
+                probe_path = os.path.join(bus_path, sensor["id"])
+                path = os.path.join(probe_path, "temperature")
+                if not os.path.exists(path):
+                    path = os.path.join(probe_path, "w1_slave")
+                scale = 0.001
+            else:
+                path, scale = sensor["path"], setting(sensor, "sensors.devices.scale")
+            threshold = sensor.get("threshold", setting(sensors_config, "sensors.threshold"))
+            sensors[SENSOR_UNIT_BASE + idx] = (path, scale, threshold)
+        
+        bulk_triggers = []
+        if setting(sensors_config, "sensors.bulk_conversion") and \
+                any("id" in sensor for sensor in sensors_config["devices"]):
+            bulk_triggers = sorted(glob.glob(os.path.join(bus_path, "w1_bus_master*", "therm_bulk_read")))
+        
+        self.sensor_poller = SensorPoller(
+            sensors,
+            self.update_sensors,
+            setting(sensors_config, "sensors.interval_s"),
+            setting(sensors_config, "sensors.report_interval_s"),
+            setting(sensors_config, "sensors.workers"),
+            bulk_triggers
+        )
+        self.sensors_config = sensors_config
+        self.sensor_thread = threading.Thread(
+            name="DomoticzRPIGPIO sensors",
+            target=self.sensor_poller.run,
+            daemon=True
+        )
+        self.sensor_thread.start()
+        self.debug("Polling %d sensors (bulk conversion on %s)", len(sensors), bulk_triggers)
+    
+    def stop_sensors(self):
+        """Stop the sensor poller; waits for a read round in progress"""
+        if self.sensor_thread:
+            self.sensor_poller.close()
+            self.sensor_thread.join(timeout=5)
+            self.sensor_thread = None
+        self.sensor_poller = None
+        self.sensors_config = None
+    
+    def update_sensors(self, updates, errors):
+        """Update sensor devices with the values reported by the poller"""
+        for unit_num, error in errors.items():
+            self.errors.error(f"sensor {unit_num}", "Error reading sensor Unit %d: %s", unit_num, error)
+        
+        for unit_num, value in updates.items():
+            if unit_num not in Devices:
+                continue
+            device = Devices[unit_num]
+            if value is None:
+                # Keep the last value, Domoticz shows the sensor in red
+                device.Update(nValue=0, sValue=device.sValue, TimedOut=1)
+            else:
+                device.Update(nValue=0, sValue=f"{value:.2f}", TimedOut=0)
+                self.debug("Sensor Unit %d: %.2f", unit_num, value)
+    
+    def init_bindings(self):
+        """Local bindings, run in the edge event path without Domoticz"""
+        self.bindings = {}
+        for binding in self.config.get("bindings", []):
+            self.bindings.setdefault(binding["input"], []).append(
+                (binding["action"], binding["unit"], setting(binding, "bindings.pulse_ms") / 1000)
+            )
+    
+    def init_journal(self, gpio_pins):
+        """Open the state journal if configured; returns its saved state or None"""
+        journal_config = self.config.get("state_journal")
+        if journal_config is None:
+            return None
+        
+        self.journal = StateJournal(
+            os.path.join(self.plugin_path, setting(journal_config, "state_journal.file")),
+            zlib.crc32(json.dumps(gpio_pins).encode()),
+            self.journal_state,
+            setting(journal_config, "state_journal.sync_interval_ms") / 1000
+        )
+        journal_state = self.journal.load()
+        if journal_state:
+            self.debug("Restoring relay states and %d timers from %s", len(journal_state[1]), self.journal.path)
+        return journal_state
+    
+    def journal_state(self):
+        """Relay mask and pending timers (unit, command, epoch deadline) for the journal"""
+        clock_offset = time.time() - time.monotonic()
+        with self.scheduler.condition:
+            timers = []
+            for due, sequence, unit_num, command in self.scheduler.timers.values():
+                if unit_num == INRUSH_TIMER:
+                    # Relays held back by the inrush limit are kept as On timers
+                    timers.extend(
+                        (pending_unit, "On", due + clock_offset) for pending_unit in self.lines
+                        if self.inrush_pending & (1 << (pending_unit - 1))
+                    )
+                else:
+                    timers.append((unit_num, command, due + clock_offset))
+        return self.output_mask, timers
+    
+    def device_mask(self, units):
+        """Bitmask (bit unit - 1) of the given relay units that are ON in Domoticz
+        
+        Dimmers of time-proportioned relays are ON with nValue 2 (a level).
+        """
+        mask = 0
+        for unit_num in units:
+            if unit_num in Devices and Devices[unit_num].nValue in (1, 2):
+                mask |= 1 << (unit_num - 1)
+        return mask
+    
+    def init_gpio(self, gpio_pins, initial_mask):
+        """Request all GPIO lines as outputs with their initial relay states
+        
+        Bit idx of initial_mask set = relay of gpio_pins[idx] ON.
+        """
+        self.debug("Initializing GPIO with %s backend", self.backend.name)
+        
+        # Unit -> GPIO pin; the relay states live in the output_mask shadow register
+        self.relays = compile_relays(self.config)
+        self.relay_bits = (1 << len(gpio_pins)) - 1
+        self.lines = {relay.unit: relay.pin for relay in self.relays[1:]}
+        
+        try:
+            # bits=-1 selects every relay
+            self.backend.open(
+                self.mask_values(initial_mask, -1),
+                [relay.pin for relay in self.relays[1:] if relay.active_low]
+            )
+        except Exception as e:
+            Domoticz.Error(f"Failed to configure GPIO lines: {str(e)}")
+            raise
+        self.output_mask = initial_mask
+        self.bind_writes()
+        
+        self.debug("Configured GPIO %s (Units 1-%d) as outputs on %s",
+                   gpio_pins, len(gpio_pins), sorted(self.backend.output_chips))
+    
+    def bind_writes(self):
+        """Bind the hot-path writes, directly to the backend of a single chip"""
+        target = self.backend.single or self.backend
+        self.write_line = target.set_value
+        self.write_lines = target.set_values
+        
+        # Traced writes are recorded once they succeeded
+        if self.trace and setting(self.config["trace"], "trace.gpio_writes"):
+            trace = self.trace
+            
+            def write_line(gpio_pin, value):
+                target.set_value(gpio_pin, value)
+                trace.writes({gpio_pin: value})
+            
+            def write_lines(values):
+                target.set_values(values)
+                trace.writes(values)
+            
+            self.write_line = write_line
+            self.write_lines = write_lines
+    
+    def init_trace(self, trace_config):
+        """Start recording commands and GPIO writes"""
+        path = os.path.join(self.plugin_path, setting(trace_config, "trace.file"))
+        try:
+            self.trace = TraceRecorder(path, self.config, self.mask_values(self.output_mask, -1))
+        except OSError as e:
+            Domoticz.Error(f"Can't open trace file {path}: {str(e)}")
+            return
+        self.bind_writes()
+        Domoticz.Log(f"Recording commands to {path}")
+    
+    def init_inputs(self, inputs):
+        """Request input lines and start the reader thread"""
+        self.inputs = {}
+        for idx, input_config in enumerate(inputs):
+            self.inputs[input_config["pin"]] = INPUT_UNIT_BASE + idx
+        
+        self.backend.open_inputs({input_config["pin"]: input_config for input_config in inputs})
+        
+        # Software settle time for backends without kernel debounce
+        self.input_settle = 0
+        if not self.backend.kernel_debounce:
+            self.input_settle = max(setting(input_config, "inputs.debounce_ms") for input_config in inputs) / 1000
+        
+        # Devices get the current input state, not only later changes
+        self.input_mask = 0
+        for unit_num in self.inputs.values():
+            if unit_num in Devices and Devices[unit_num].nValue == 1:
+                self.input_mask |= 1 << (unit_num - INPUT_UNIT_BASE)
+        self.update_inputs(self.backend.get_input_values())
+        
+        self.input_wake = os.pipe()
+        self.input_thread = threading.Thread(
+            name="DomoticzRPIGPIO inputs",
+            target=self.input_worker,
+            daemon=True
+        )
+        self.input_thread.start()
+        self.debug("Configured GPIO %s (Units %d-%d) as inputs",
+                   list(self.inputs), INPUT_UNIT_BASE, INPUT_UNIT_BASE + len(inputs) - 1)
+    
+    def input_worker(self):
+        """Reader thread: block on the input fds and handle edge events in batches"""
+        wake_fd = self.input_wake[0]
+        fds = self.backend.input_fds() + [wake_fd]
+        while True:
+            ready, _, _ = select.select(fds, [], [])
+            if wake_fd in ready:
+                break
+            
+            try:
+                # Only the last event per pin matters
+                states = {}
+                for fd in ready:
+                    for gpio_pin, active in self.backend.read_input_events(fd):
+                        states[gpio_pin] = active
+                
+                if self.input_settle:
+                    time.sleep(self.input_settle)
+                    states = self.backend.get_input_values()
+                
+                self.update_inputs(states)
+            except Exception as e:
+                self.errors.error("input", "Error reading GPIO inputs: %s", e)
+    
+    def update_inputs(self, states):
+        """Update input devices whose state changed (GPIO pin -> active)"""
+        new_mask = self.input_mask
+        for gpio_pin, active in states.items():
+            bit = 1 << (self.inputs[gpio_pin] - INPUT_UNIT_BASE)
+            if active:
+                new_mask |= bit
+            else:
+                new_mask &= ~bit
+        
+        changed = self.input_mask ^ new_mask
+        self.input_mask = new_mask
+        if not changed:
+            return
+        
+        # Switch bound outputs first, Domoticz devices are updated afterwards
+        if self.bindings and self.enabled:
+            self.run_bindings(changed, new_mask)
+        
+        for gpio_pin, unit_num in self.inputs.items():
+            bit = 1 << (unit_num - INPUT_UNIT_BASE)
+            if changed & bit and unit_num in Devices:
+                if new_mask & bit:
+                    Devices[unit_num].Update(nValue=1, sValue="On")
+                else:
+                    Devices[unit_num].Update(nValue=0, sValue="Off")
+                self.debug("Input Unit %d (GPIO %s) changed to %s", unit_num, gpio_pin, "ON" if new_mask & bit else "OFF")
+    
+    def run_bindings(self, changed, mask):
+        """Apply the local bindings of inputs that changed, as one batch"""
+        commands = {}
+        pulses = []
+        for gpio_pin, bindings in self.bindings.items():
+            bit = 1 << (self.inputs[gpio_pin] - INPUT_UNIT_BASE)
+            if not changed & bit:
+                continue
+            active = bool(mask & bit)
+            for action, unit_num, pulse_time in bindings:
+                if action == "follow":
+                    commands[unit_num] = "On" if active else "Off"
+                elif active and action == "toggle":
+                    commands[unit_num] = "Toggle"
+                elif active and action == "pulse":
+                    commands[unit_num] = "On"
+                    pulses.append((unit_num, pulse_time))
         
-        # Open GPIO chip - use full path
-        gpio_chip_path = f"/dev/{gpio_chip_name}"
-        self.chip = self.gpiod_module.Chip(gpio_chip_path)
-        Domoticz.Log(f"Opened GPIO chip: {gpio_chip_path}")
+        if commands:
+            self.apply_commands(commands)
         
-        # Determine initial GPIO state based on relay logic
-        initial_state = 1 if relay_logic == "active_low" else 0
+        for unit_num, pulse_time in pulses:
+            self.scheduler.schedule(unit_num, "Off", pulse_time)
+    
+    def stop_inputs(self):
+        """Stop the input reader thread and release the input lines"""
+        if self.input_thread:
+            os.write(self.input_wake[1], b"x")
+            self.input_thread.join(timeout=5)
+            self.input_thread = None
+            os.close(self.input_wake[0])
+            os.close(self.input_wake[1])
+            self.input_wake = None
         
-        # Request GPIO lines as outputs
-        for idx, gpio_pin in enumerate(gpio_pins):
-            unit_num = idx + 1
-            try:
-                line = self.chip.get_line(gpio_pin)
-                line.request(
-                    consumer="domoticz-gpio",
-                    type=self.gpiod_module.LINE_REQ_DIR_OUT,
-                    default_vals=[initial_state]
-                )
-                self.lines[unit_num] = {
-                    'line': line,
-                    'gpio_pin': gpio_pin
-                }
-                Domoticz.Log(f"Configured GPIO {gpio_pin} (Unit {unit_num}) as output, initial state: {initial_state}")
-            except Exception as e:
-                Domoticz.Error(f"Failed to configure GPIO {gpio_pin} (Unit {unit_num}): {str(e)}")
+        if self.inputs:
+            self.backend.release_inputs()
+            self.inputs = {}
     
-    def init_gpio_v2(self, gpio_chip_name, gpio_pins, relay_logic):
-        """Initialize GPIO using gpiod v2.x API"""
-        Domoticz.Log("Initializing GPIO with v2.x API")
+    def onStop(self):
+        Domoticz.Log("Domoticz RPI GPIO plugin stopping")
+        self.enabled = False
         
-        gpio_chip_path = f"/dev/{gpio_chip_name}"
+        if self.control:
+            self.control.close()
+            self.control = None
         
-        # Determine initial GPIO state based on relay logic
-        from gpiod.line import Direction, Value
-        initial_value = Value.INACTIVE if relay_logic == "active_low" else Value.ACTIVE
+        self.stop_inputs()
+        self.stop_proportioning()
+        self.stop_sensors()
         
-        # Create line settings for all pins
-        line_settings = {}
-        for gpio_pin in gpio_pins:
-            line_settings[gpio_pin] = self.gpiod_module.LineSettings(
-                direction=Direction.OUTPUT,
-                output_value=initial_value
-            )
+        if self.scheduler_thread:
+            self.scheduler.close()
+            self.scheduler_thread.join(timeout=5)
+            self.scheduler_thread = None
+        
+        # Let the worker apply what is already queued, then stop it
+        if self.command_thread:
+            self.command_queue.close()
+            self.command_thread.join(timeout=5)
+            self.command_thread = None
+            self.command_queue = None
+        
+        # The final state is journaled before stop_gpio turns all relays off
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+            self.bind_writes()
         
-        # Request all lines at once
+        if self.backend:
+            self.stop_gpio()
+        
+        Domoticz.Log("Plugin stopped")
+    
+    def stop_gpio(self):
+        """Turn off all relays and release the GPIO lines"""
         try:
-            self.line_request = self.gpiod_module.request_lines(
-                gpio_chip_path,
-                consumer="domoticz-gpio",
-                config=line_settings
-            )
+            if self.lines:
+                self.write_lines({gpio_pin: 0 for gpio_pin in self.lines.values()})
+                self.output_mask = 0
+                self.debug("Turned off GPIO %s", list(self.lines.values()))
             
-            # Store line info for each unit
-            for idx, gpio_pin in enumerate(gpio_pins):
-                unit_num = idx + 1
-                self.lines[unit_num] = {
-                    'gpio_pin': gpio_pin
-                }
-                Domoticz.Log(f"Configured GPIO {gpio_pin} (Unit {unit_num}) as output")
-                
+            self.backend.release()
+            self.debug("Released GPIO lines")
         except Exception as e:
-            Domoticz.Error(f"Failed to configure GPIO lines: {str(e)}")
-            raise
+            Domoticz.Error(f"Error releasing GPIO: {str(e)}")
     
-    def onStop(self):
-        Domoticz.Log("Domoticz RPI GPIO plugin stopping")
+    def onHeartbeat(self):
+        self.errors.flush()
+        if self.trace:
+            self.trace.flush()
         
-        # Get relay logic from config
-        relay_logic = self.config.get("relay_logic", "active_low")
+        if self.enabled and setting(self.config, "config_reload"):
+            self.check_config()
         
-        if self.gpiod_version >= 2:
-            self.stop_gpio_v2(relay_logic)
-        else:
-            self.stop_gpio_v1(relay_logic)
+        metrics_config = self.config.get("metrics")
+        if self.enabled and metrics_config is not None:
+            if time.monotonic() - self.metrics_published >= setting(metrics_config, "metrics.interval_s"):
+                self.publish_metrics(metrics_config)
         
-        Domoticz.Log("Plugin stopped")
+        readback_config = self.config.get("readback")
+        if self.enabled and readback_config is not None and time.monotonic() >= self.readback_due:
+            self.check_outputs(readback_config)
     
-    def stop_gpio_v1(self, relay_logic):
-        """Stop GPIO using v1.x API"""
-        off_state = 1 if relay_logic == "active_low" else 0
+    def check_outputs(self, readback_config):
+        """Compare the output lines with the shadow register and fix drift
         
-        # Release all GPIO lines and turn off relays
-        for unit_num, line_info in self.lines.items():
+        All lines are read with one read per chip. The interval doubles after
+        every check without drift, up to max_interval_s, and drops back to
+        interval_s as soon as a line has drifted.
+        """
+        policy = setting(readback_config, "readback.policy")
+        changed = 0
+        with self.gpio_lock:
+            expected = self.mask_values(self.output_mask, -1)
             try:
-                line = line_info['line']
-                gpio_pin = line_info['gpio_pin']
-                line.set_value(off_state)
-                line.release()
-                Domoticz.Log(f"Released GPIO {gpio_pin} (Unit {unit_num})")
+                actual = self.backend.get_values()
             except Exception as e:
-                Domoticz.Error(f"Error releasing GPIO for Unit {unit_num}: {str(e)}")
+                self.errors.error("readback", "Error reading back GPIO outputs: %s", e)
+                actual = {}
+            drifted = {
+                gpio_pin: value for gpio_pin, value in actual.items()
+                if gpio_pin in expected and expected[gpio_pin] != value
+            }
+            
+            if drifted and policy == "correct":
+                try:
+                    self.write_lines({gpio_pin: expected[gpio_pin] for gpio_pin in drifted})
+                except Exception as e:
+                    self.errors.error("write", "Error correcting GPIO %s: %s", list(drifted), e)
+            elif drifted:
+                units = {gpio_pin: unit_num for unit_num, gpio_pin in self.lines.items()}
+                new_mask = self.output_mask
+                for gpio_pin, value in drifted.items():
+                    bit = 1 << (units[gpio_pin] - 1)
+                    if value:
+                        new_mask |= bit
+                    else:
+                        new_mask &= ~bit
+                changed = self.output_mask ^ new_mask
+                self.output_mask = new_mask
         
-        # Close chip
-        if self.chip:
+        if changed:
+            if self.control:
+                self.control.publish(self.output_mask, changed)
+            self.update_devices(changed, self.output_mask)
+            if self.journal:
+                self.journal.mark()
+        
+        interval_s = setting(readback_config, "readback.interval_s")
+        if drifted:
+            self.readback_interval = interval_s
+            drifted_units = sorted(unit_num for unit_num, gpio_pin in self.lines.items() if gpio_pin in drifted)
+            self.errors.error("drift", "GPIO %s (Units %s) did not match the relay state, %s",
+                              list(drifted), drifted_units, "corrected" if policy == "correct" else "adopted")
+        else:
+            self.readback_interval = min(max(self.readback_interval * 2, interval_s),
+                                         setting(readback_config, "readback.max_interval_s"))
+        self.readback_due = time.monotonic() + self.readback_interval
+        self.debug("Checked %d output lines, next check in %d s", len(actual), self.readback_interval)
+    
+    def publish_metrics(self, metrics_config):
+        """Write the metrics file and update the metrics sensors"""
+        self.metrics_published = time.monotonic()
+        
+        metrics_file = metrics_config.get("file")
+        if metrics_file:
+            if setting(metrics_config, "metrics.format") == "json":
+                content = self.metrics.json(self.lines)
+            else:
+                content = self.metrics.prometheus(self.lines)
+            
+            # Write atomically, readers never see a half-written file
             try:
-                del self.chip
-                Domoticz.Log("Closed GPIO chip")
-            except Exception as e:
-                Domoticz.Error(f"Error closing GPIO chip: {str(e)}")
+                temp_file = f"{metrics_file}.tmp"
+                with open(temp_file, 'w') as f:
+                    f.write(content)
+                os.replace(temp_file, metrics_file)
+            except OSError as e:
+                Domoticz.Error(f"Error writing metrics file {metrics_file}: {str(e)}")
+        
+        if setting(metrics_config, "metrics.domoticz_sensors"):
+            mean_ms = self.metrics.mean_total_ms()
+            if mean_ms is not None and METRICS_UNIT_BASE in Devices:
+                Devices[METRICS_UNIT_BASE].Update(nValue=0, sValue=f"{mean_ms:.2f}")
+            switches = sum(self.metrics.switches)
+            if METRICS_UNIT_BASE + 1 in Devices:
+                Devices[METRICS_UNIT_BASE + 1].Update(nValue=0, sValue=str(switches))
+    
+    def check_config(self):
+        """Reload gpio_config.json when its modification time changed"""
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return
+        
+        if mtime != self.config_mtime:
+            self.reload_config()
     
-    def stop_gpio_v2(self, relay_logic):
-        """Stop GPIO using v2.x API"""
-        from gpiod.line import Value
-        off_value = Value.INACTIVE if relay_logic == "active_low" else Value.ACTIVE
+    def reload_config(self):
+        """Apply a changed gpio_config.json without restarting the plugin
         
-        # Turn off all relays
-        if self.line_request:
+        Only lines that were added or removed are requested or released; all
+        other relays keep their lines and their state untouched.
+        """
+        Domoticz.Log("Configuration file changed, reloading...")
+        start_time = time.monotonic()
+        
+        old_config = self.config
+        if not self.load_config():
+            self.config = old_config
+            Domoticz.Error("Keeping the current configuration")
+            return
+        
+        # Applying the other changes alone could request lines with the old
+        # polarity or chips, so the whole file waits for the restart
+        restart_keys = [key for key in RESTART_ONLY_KEYS if self.config.get(key) != old_config.get(key)]
+        if restart_keys:
+            self.config = old_config
+            Domoticz.Error(f"Changing {', '.join(repr(key) for key in restart_keys)} requires a plugin restart, "
+                           f"keeping the current configuration")
+            return
+        
+        gpio_pins = self.config["gpio_pins"]
+        
+        with self.gpio_lock:
+            old_lines = self.lines
+            old_mask = self.output_mask
+            old_values = self.mask_values(old_mask, -1)
+            
+            # The state follows the pin: lines that stay keep their value even
+            # if their unit changed, lines of new units take it from Domoticz
+            # and lines moved to an existing unit start OFF
+            relays = compile_relays(self.config)
+            lines = {relay.unit: relay.pin for relay in relays[1:]}
+            new_mask = 0
+            for relay in relays[1:]:
+                if old_values.get(relay.pin, 0):
+                    new_mask |= relay.bit
+            new_mask |= self.device_mask([unit_num for unit_num in lines if unit_num not in old_lines])
+            new_values = {relay.pin: 1 if new_mask & relay.bit else 0 for relay in relays[1:]}
+            
+            # Removed relays are turned off before their lines are given up
+            removed_pins = [gpio_pin for gpio_pin in old_values if gpio_pin not in new_values]
             try:
-                for unit_num, line_info in self.lines.items():
-                    gpio_pin = line_info['gpio_pin']
-                    self.line_request.set_value(gpio_pin, off_value)
-                    Domoticz.Log(f"Turned off GPIO {gpio_pin} (Unit {unit_num})")
-                
-                # Release request
-                self.line_request.release()
-                Domoticz.Log("Released GPIO lines")
+                if removed_pins:
+                    self.write_lines({gpio_pin: 0 for gpio_pin in removed_pins})
+                self.backend.update_lines(
+                    new_values,
+                    removed_pins,
+                    [relay.pin for relay in relays[1:] if relay.active_low]
+                )
             except Exception as e:
-                Domoticz.Error(f"Error releasing GPIO: {str(e)}")
+                # Nothing is switched over: the old tables stay, and the file
+                # is tried again on the next heartbeat
+                Domoticz.Error(f"Failed to reload configuration: {str(e)}")
+                self.config = old_config
+                self.config_mtime = None
+                if removed_pins:
+                    try:
+                        self.write_lines({gpio_pin: old_values[gpio_pin] for gpio_pin in removed_pins})
+                    except Exception as e:
+                        Domoticz.Error(f"Failed to restore removed relays: {str(e)}")
+                return
+            
+            self.relays = relays
+            self.relay_bits = (1 << len(gpio_pins)) - 1
+            self.lines = lines
+            self.output_mask = new_mask
+            self.bind_writes()
+        
+        try:
+            # Units now on another pin: their timers belonged to the old
+            # relay, and their devices show the state of the old one
+            for unit_num, gpio_pin in old_lines.items():
+                if lines.get(unit_num) != gpio_pin:
+                    self.scheduler.cancel(unit_num)
+            moved = (old_mask ^ new_mask) & ~self.proportioned_mask
+            for unit_num, gpio_pin in lines.items():
+                bit = 1 << (unit_num - 1)
+                if moved & bit and old_lines.get(unit_num, gpio_pin) != gpio_pin and unit_num in Devices:
+                    if new_mask & bit:
+                        Devices[unit_num].Update(nValue=1, sValue="On")
+                    else:
+                        Devices[unit_num].Update(nValue=0, sValue="Off")
+            
+            self.sync_devices()
+            pin_units = {gpio_pin: unit_num for unit_num, gpio_pin in self.lines.items()}
+            old_groups, old_selectors = self.groups, self.selectors
+            self.init_groups(pin_units, self.config.get("relay_groups", []))
+            self.init_selectors(pin_units)
+            
+            # Timers of changed or removed groups and selectors (Set Level,
+            # break-before-make) would switch relays of the new configuration
+            for unit_num, group_mask in old_groups.items():
+                if self.groups.get(unit_num) != group_mask:
+                    self.scheduler.cancel(unit_num)
+            for unit_num, selector in old_selectors.items():
+                if self.selectors.get(unit_num) != selector:
+                    self.scheduler.cancel(unit_num)
+            self.update_group_devices(-1, self.output_mask)
+            if self.selectors:
+                self.update_selector_devices(-1, self.output_mask)
+            self.init_timers(pin_units)
+            self.init_inrush(pin_units)
+            self.init_proportioning(pin_units)
+            self.init_sensors()
+            
+            if self.journal:
+                self.journal.config_id = zlib.crc32(json.dumps(gpio_pins).encode())
+                self.journal.mark()
+            
+            if self.config.get("inputs", []) != old_config.get("inputs", []):
+                self.stop_inputs()
+                if self.config.get("inputs"):
+                    self.init_inputs(self.config["inputs"])
+            self.init_bindings()
+        except Exception as e:
+            Domoticz.Error(f"Failed to reload configuration: {str(e)}")
+            return
+        
+        added_pins = [gpio_pin for gpio_pin in new_values if gpio_pin not in old_values]
+        Domoticz.Log(f"Configuration reloaded in {(time.monotonic() - start_time) * 1000:.1f} ms "
+                     f"(added GPIO {added_pins}, removed GPIO {removed_pins})")
     
     def onCommand(self, Unit, Command, Level, Hue):
-        Domoticz.Log(f"onCommand called for Unit {Unit}: Command={Command}, Level={Level}")
+        received_ns = time.perf_counter_ns()
+        if self.trace:
+            self.trace.command(Unit, Command, Level, Hue)
+        self.debug("onCommand called for Unit %d: Command=%s, Level=%s", Unit, Command, Level)
         
         if not self.enabled:
-            Domoticz.Error("Plugin not properly initialized")
+            self.errors.error("disabled", "Plugin not properly initialized")
+            return
+        
+        if Unit not in self.lines and Unit not in self.groups and Unit not in self.selectors:
+            self.errors.error("unit", "Invalid relay unit: %d", Unit)
+            return
+        
+        # Time-proportioned relays: the level is the duty, the proportioner switches the relay
+        if self.proportioner and Unit in self.proportioner.duty:
+            self.set_duty(Unit, Command, Level)
+            return
+        
+        # Selectors: the command becomes the level index; On selects the first level after Off
+        if Unit in self.selectors:
+            if Command == "Set Level":
+                Command = Level // 10
+            elif Command in ("On", "Off"):
+                Command = 1 if Command == "On" else 0
+            if not isinstance(Command, int) or Command >= len(self.selectors[Unit][1]):
+                self.errors.error("command", "Unsupported command for Unit %d: %s, Level=%s", Unit, Command, Level)
+                return
+        
+        # "Set Level" on a switch means "On for Level seconds"
+        elif Command == "Set Level":
+            if Level > 0:
+                self.scheduler.schedule(Unit, "Off", Level)
+                Command = "On"
+            else:
+                Command = "Off"
+        
+        if Command not in ("On", "Off") and Unit not in self.selectors:
+            self.errors.error("command", "Unsupported command for Unit %d: %s", Unit, Command)
             return
         
-        if Unit not in self.lines:
-            Domoticz.Error(f"Invalid relay unit: {Unit}")
+        self.metrics.received_ns[Unit] = received_ns
+        
+        # Hand the command to the worker thread, or apply it right away
+        if self.command_queue:
+            if not self.command_queue.put(Unit, Command):
+                self.errors.error("queue", "Command queue full, dropped command for Unit %d: %s", Unit, Command)
+        else:
+            self.apply_commands({Unit: Command})
+    
+    def control_request(self, request, reply):
+        """Handle one request from the control socket (see ControlServer)"""
+        received_ns = time.perf_counter_ns()
+        words = request.split()
+        if not words:
+            return
+        if self.trace:
+            self.trace.request(request)
+        verb = words[0].upper()
+        if not self.enabled:
+            reply("ERR plugin not running")
             return
         
         try:
-            line_info = self.lines[Unit]
-            gpio_pin = line_info['gpio_pin']
-            relay_logic = self.config.get("relay_logic", "active_low")
+            if verb in ("GET", "SUBSCRIBE"):
+                reply(f"STATE {self.output_mask:x}")
+                return
             
-            if self.gpiod_version >= 2:
-                self.set_gpio_v2(Unit, gpio_pin, Command, relay_logic)
+            if verb == "SET":
+                mask = int(words[1], 16)
+                bits = int(words[2], 16) if len(words) > 2 else -1
+                commands = {
+                    unit_num: "On" if mask & (1 << (unit_num - 1)) else "Off"
+                    for unit_num in self.lines if bits & (1 << (unit_num - 1))
+                }
+            elif verb in ("ON", "OFF", "TOGGLE"):
+                bits = int(words[1], 16)
+                commands = {unit_num: verb.title() for unit_num in self.lines if bits & (1 << (unit_num - 1))}
+            elif verb == "UNIT":
+                unit_num = int(words[1])
+                command = words[2].title()
+                if unit_num in self.selectors:
+                    command = int(words[2])
+                    if not 0 <= command < len(self.selectors[unit_num][1]):
+                        reply(f"ERR invalid level {command}")
+                        return
+                elif unit_num not in self.lines and unit_num not in self.groups:
+                    reply(f"ERR invalid unit {unit_num}")
+                    return
+                elif command not in ("On", "Off", "Toggle"):
+                    reply(f"ERR invalid command {words[2]}")
+                    return
+                commands = {unit_num: command}
             else:
-                self.set_gpio_v1(Unit, gpio_pin, Command, relay_logic)
-            
-        except Exception as e:
-            Domoticz.Error(f"Error controlling Unit {Unit}: {str(e)}")
+                reply(f"ERR unknown request {words[0]}")
+                return
+        except (IndexError, ValueError):
+            reply(f"ERR invalid request: {request.strip()}")
+            return
+        
+        for unit_num in commands:
+            self.metrics.received_ns[unit_num] = received_ns
+        self.apply_commands(
+            commands,
+            lambda mask: reply(f"STATE {mask:x}" if mask is not None else "ERR GPIO write failed")
+        )
     
-    def set_gpio_v1(self, unit_num, gpio_pin, command, relay_logic):
-        """Set GPIO using v1.x API"""
-        line = self.lines[unit_num]['line']
+    def command_worker(self):
+        """Worker thread: drain the command queue and apply batches"""
+        while True:
+            batch = self.command_queue.take()
+            if batch is None:
+                break
+            commands, changed = batch
+            # A failing batch must not stop the worker: later commands still run
+            try:
+                if changed:
+                    # Handed over by apply_commands: the devices show the latest state
+                    update_ns = time.perf_counter_ns()
+                    self.update_devices(changed, self.output_mask, switched=False)
+                    self.metrics.observe(STAGE_UPDATE, time.perf_counter_ns() - update_ns)
+                if commands:
+                    self.apply_commands(commands)
+            except Exception as e:
+                self.errors.error("worker", "Error applying commands for Units %s: %s", list(commands), e)
+    
+    def mask_values(self, mask, bits):
+        """GPIO values (1 = ON) for the relays selected by bits, according to mask
         
-        # Determine GPIO value based on relay logic and command
-        if relay_logic == "active_low":
-            gpio_value = 0 if command == "On" else 1
-        else:
-            gpio_value = 1 if command == "On" else 0
+        Only the selected bits are visited, each with one pin table lookup.
+        """
+        relays = self.relays
+        bits &= self.relay_bits
+        values = {}
+        while bits:
+            bit = bits & -bits
+            values[relays[bit.bit_length()].pin] = 1 if mask & bit else 0
+            bits ^= bit
+        return values
+    
+    def apply_commands(self, commands, written=None):
+        """Apply pending commands (unit -> "On"/"Off"/"Toggle", or a level
+        index for selectors, oldest first)
         
-        # Set GPIO value
-        line.set_value(gpio_value)
+        Later commands override earlier ones for the same relay. Only relays
+        whose state differs from the shadow register are written, all with
+        a single GPIO write, and only their devices are updated. written, if
+        given, is called with the new relay mask (None if the write failed)
+        right after the GPIO write; the devices are then updated by the
+        command worker, so the calling thread is not held up by Domoticz.
+        """
+        metrics = self.metrics
+        start_ns = time.perf_counter_ns()
+        for unit_num in commands:
+            if metrics.received_ns[unit_num]:
+                metrics.observe(STAGE_QUEUE, start_ns - metrics.received_ns[unit_num])
         
-        # Update device status
-        if command == "On":
-            Devices[unit_num].Update(nValue=1, sValue="On")
-            Domoticz.Log(f"Unit {unit_num} (GPIO {gpio_pin}) turned ON (GPIO={gpio_value})")
-        elif command == "Off":
-            Devices[unit_num].Update(nValue=0, sValue="Off")
-            Domoticz.Log(f"Unit {unit_num} (GPIO {gpio_pin}) turned OFF (GPIO={gpio_value})")
-    
-    def set_gpio_v1_silent(self, gpio_pin, line_info, command, relay_logic):
-        """Set GPIO using v1.x API without updating Domoticz (for state restoration)"""
-        line = line_info['line']
+        with self.gpio_lock:
+            # Relays held back by the inrush limit count as ON for the commands
+            old_mask = self.output_mask
+            new_mask = old_mask | self.inrush_pending
+            for unit_num, command in commands.items():
+                # Selector commands are level indexes
+                if isinstance(command, int):
+                    new_mask = self.select_level(unit_num, command, new_mask)
+                    continue
+                
+                bits = self.groups.get(unit_num) or (1 << (unit_num - 1))
+                if command == "Toggle":
+                    # A group toggles to OFF only when all its relays are ON
+                    command = "Off" if new_mask & bits == bits else "On"
+                if command == "On":
+                    if new_mask & bits == bits:
+                        metrics.redundant[unit_num] += 1
+                    new_mask |= bits
+                else:
+                    if not new_mask & bits:
+                        metrics.redundant[unit_num] += 1
+                    new_mask &= ~bits
+                    self.scheduler.cancel(unit_num)
+            
+            if self.inrush or self.inrush_pending:
+                new_mask = self.limit_inrush(old_mask, new_mask)
+            
+            changed = old_mask ^ new_mask
+            error = None
+            if changed:
+                values = self.mask_values(new_mask, changed)
+                write_ns = time.perf_counter_ns()
+                try:
+                    if len(values) == 1:
+                        self.write_line(*values.popitem())
+                    else:
+                        self.write_lines(values)
+                    update_ns = time.perf_counter_ns()
+                    metrics.observe(STAGE_WRITE, update_ns - write_ns)
+                    self.output_mask = new_mask
+                except Exception as e:
+                    error = e
         
-        # Determine GPIO value based on relay logic and command
-        if relay_logic == "active_low":
-            gpio_value = 0 if command == "On" else 1
-        else:
-            gpio_value = 1 if command == "On" else 0
+        if error:
+            for unit_num in commands:
+                metrics.errors[unit_num] += 1
+            self.errors.error("write", "Error controlling Units %s: %s", list(commands), error)
+        if error or not changed:
+            metrics.finish(commands, time.perf_counter_ns())
+            if written:
+                written(None if error else new_mask)
+            return
+        
+        if written:
+            written(new_mask)
+        if self.control:
+            self.control.publish(new_mask, changed)
+        
+        # Arm pulse/auto-off timers of relays that were turned on
+        if self.auto_off:
+            for unit_num, delay in self.auto_off.items():
+                if changed & new_mask & (1 << (unit_num - 1)):
+                    self.scheduler.schedule(unit_num, "Off", delay, replace=False)
+        
+        if self.journal:
+            self.journal.mark()
         
-        # Set GPIO value only
-        line.set_value(gpio_value)
+        if written and self.command_queue:
+            self.count_switches(changed)
+            self.command_queue.put_updates(changed)
+            metrics.finish(commands, time.perf_counter_ns())
+            return
+        
+        self.update_devices(changed, new_mask)
+        end_ns = time.perf_counter_ns()
+        metrics.observe(STAGE_UPDATE, end_ns - update_ns)
+        metrics.finish(commands, end_ns)
     
-    def set_gpio_v2(self, unit_num, gpio_pin, command, relay_logic):
-        """Set GPIO using v2.x API"""
-        from gpiod.line import Value
+    def count_switches(self, changed):
+        """Count the switch cycles of changed relays"""
+        switches = self.metrics.switches
+        for unit_num in self.lines:
+            if changed & (1 << (unit_num - 1)):
+                switches[unit_num] += 1
+    
+    def update_devices(self, changed, mask, switched=True):
+        """Update devices of changed relays and of groups they belong to
         
-        # Determine GPIO value based on relay logic and command
-        if relay_logic == "active_low":
-            gpio_value = Value.ACTIVE if command == "On" else Value.INACTIVE
-        else:
-            gpio_value = Value.INACTIVE if command == "On" else Value.ACTIVE
+        switched=False for updates whose switch cycles were already counted.
+        """
+        if switched:
+            self.count_switches(changed)
+        # Devices of time-proportioned relays show the duty, not the relay state
+        device_changed = changed & ~self.proportioned_mask
+        for unit_num, gpio_pin in self.lines.items():
+            bit = 1 << (unit_num - 1)
+            if device_changed & bit and unit_num in Devices:
+                if mask & bit:
+                    Devices[unit_num].Update(nValue=1, sValue="On")
+                else:
+                    Devices[unit_num].Update(nValue=0, sValue="Off")
+                self.debug("Unit %d (GPIO %s) turned %s", unit_num, gpio_pin, "ON" if mask & bit else "OFF")
         
-        # Set GPIO value
-        self.line_request.set_value(gpio_pin, gpio_value)
+        self.update_group_devices(changed, mask)
+        if self.selectors:
+            self.update_selector_devices(changed, mask)
+    
+    def update_group_devices(self, changed, mask):
+        """Update group devices; a group is ON when all its relays are ON"""
+        for group_unit, group_mask in self.groups.items():
+            if changed & group_mask and group_unit in Devices:
+                n_value = 1 if mask & group_mask == group_mask else 0
+                if Devices[group_unit].nValue != n_value:
+                    Devices[group_unit].Update(nValue=n_value, sValue="On" if n_value else "Off")
+    
+    def update_selector_devices(self, changed, mask):
+        """Update selector devices to the level matching their relays
         
-        # Update device status
-        if command == "On":
-            Devices[unit_num].Update(nValue=1, sValue="On")
-            Domoticz.Log(f"Unit {unit_num} (GPIO {gpio_pin}) turned ON (GPIO={gpio_value})")
-        elif command == "Off":
-            Devices[unit_num].Update(nValue=0, sValue="Off")
-            Domoticz.Log(f"Unit {unit_num} (GPIO {gpio_pin}) turned OFF (GPIO={gpio_value})")
+        Relay patterns that match no level (relays switched one by one, or
+        half way through a break-before-make) show as level 0.
+        """
+        for selector_unit, (bits, level_masks, mask_levels, break_s) in self.selectors.items():
+            if changed & bits and selector_unit in Devices:
+                level = mask_levels.get(mask & bits, 0)
+                s_value = str(level * 10)
+                if Devices[selector_unit].sValue != s_value:
+                    Devices[selector_unit].Update(nValue=2 if level else 0, sValue=s_value)
     
-    def set_gpio_v2_silent(self, gpio_pin, command, relay_logic):
-        """Set GPIO using v2.x API without updating Domoticz (for state restoration)"""
-        from gpiod.line import Value
+    def select_level(self, unit_num, level, mask):
+        """Relay mask for switching selector unit_num to level
         
-        # Determine GPIO value based on relay logic and command
-        if relay_logic == "active_low":
-            gpio_value = Value.ACTIVE if command == "On" else Value.INACTIVE
-        else:
-            gpio_value = Value.INACTIVE if command == "On" else Value.ACTIVE
+        With break_before_make_ms, relays of the old level are released
+        first and the new ones are switched on by a timer, so two contactors
+        of e.g. a fan's speed windings are never closed together.
         
-        # Set GPIO value only
-        self.line_request.set_value(gpio_pin, gpio_value)
+        A level that no longer exists (a timer or queued command from before
+        a reload) leaves the mask unchanged.
+        """
+        selector = self.selectors.get(unit_num)
+        if selector is None or not 0 <= level < len(selector[1]):
+            self.errors.error("command", "Unit %d has no selector level %d any more", unit_num, level)
+            return mask
+        bits, level_masks, mask_levels, break_s = selector
+        target = level_masks[level]
+        releasing = mask & bits & ~target
+        # A pending timer means a release is still within its break time
+        if break_s and target & ~mask and (releasing or unit_num in self.scheduler.timers):
+            self.scheduler.schedule(unit_num, level, break_s)
+            return mask & ~releasing
+        
+        self.scheduler.cancel(unit_num)
+        if mask & bits == target:
+            self.metrics.redundant[unit_num] += 1
+        return mask & ~bits | target
     
     def load_config(self):
         """Load configuration from gpio_config.json"""
-        config_file = os.path.join(self.plugin_path, "gpio_config.json")
+        config_file = self.config_file
         
-        Domoticz.Log(f"Loading configuration from: {config_file}")
+        self.debug("Loading configuration from: %s", config_file)
         
         if not os.path.exists(config_file):
             Domoticz.Error(f"Configuration file not found: {config_file}")
@@ -395,6 +3367,8 @@ class BasePlugin:
             return False
         
         try:
+            # Remember the version of the file that is loaded, for reloads
+            self.config_mtime = os.stat(config_file).st_mtime_ns
             with open(config_file, 'r') as f:
                 self.config = json.load(f)
             
@@ -411,14 +3385,86 @@ class BasePlugin:
                 Domoticz.Error("'gpio_pins' list is empty")
                 return False
             
+            # Misspelled keys would otherwise be ignored without a word
+            unknown = list(unknown_keys(self.config))
+            for key_path, match in unknown:
+                hint = f" (did you mean '{match}'?)" if match else ""
+                Domoticz.Error(f"Unknown key '{key_path}' in {os.path.basename(config_file)}{hint}")
+            if unknown:
+                return False
+            
             # Set defaults for optional fields
             if "relay_logic" not in self.config:
-                self.config["relay_logic"] = "active_low"
-                Domoticz.Log("Using default relay_logic: active_low")
+                self.config["relay_logic"] = CONFIG_DEFAULTS["relay_logic"]
+                self.debug("Using default relay_logic: active_low")
             
             if "gpio_chip" not in self.config:
-                self.config["gpio_chip"] = "gpiochip0"
-                Domoticz.Log("Using default gpio_chip: gpiochip0")
+                self.config["gpio_chip"] = CONFIG_DEFAULTS["gpio_chip"]
+                self.debug("Using default gpio_chip: gpiochip0")
+            
+            if not is_name(self.config["gpio_chip"]):
+                Domoticz.Error(f"Invalid gpio_chip {self.config['gpio_chip']!r}: must be a chip name, path or label")
+                return False
+            
+            if len(self.config["gpio_pins"]) > MAX_RELAYS:
+                Domoticz.Error(f"Too many relays (max {MAX_RELAYS})")
+                return False
+            
+            # Validate shift register banks; their control lines are outputs too
+            shift_registers = self.config.get("shift_registers", [])
+            if not isinstance(shift_registers, list):
+                Domoticz.Error("'shift_registers' must be a list")
+                return False
+            
+            output_lines = set()
+            register_bits = {}
+            for idx, register in enumerate(shift_registers):
+                if not isinstance(register, dict) or not isinstance(register.get("name"), str) or \
+                        not register["name"] or ":" in register["name"]:
+                    Domoticz.Error(f"Shift register {idx + 1} must have a 'name' without ':'")
+                    return False
+                
+                name = register["name"]
+                if name in register_bits or name.startswith("gpiochip"):
+                    Domoticz.Error(f"Shift register '{name}': name is already used")
+                    return False
+                
+                registers = register.get("registers")
+                if not is_number(registers, int) or not 1 <= registers <= MAX_SHIFT_REGISTERS:
+                    Domoticz.Error(f"Shift register '{name}': 'registers' must be 1-{MAX_SHIFT_REGISTERS}")
+                    return False
+                register_bits[name] = registers * 8
+                
+                control_chip = register.get("chip", self.config["gpio_chip"])
+                if not is_name(control_chip):
+                    Domoticz.Error(f"Shift register '{name}': 'chip' must be a chip name, path or label")
+                    return False
+                for key in ["data", "clock", "latch"] + (["oe"] if "oe" in register else []):
+                    offset = register.get(key)
+                    if not is_number(offset, int) or offset < 0:
+                        Domoticz.Error(f"Shift register '{name}': '{key}' must be a line offset")
+                        return False
+                    
+                    if (control_chip, offset) in output_lines:
+                        Domoticz.Error(f"Shift register '{name}': GPIO {offset} is already used")
+                        return False
+                    output_lines.add((control_chip, offset))
+            
+            # Validate pins: line offsets on gpio_chip or "chip:offset"
+            for gpio_pin in self.config["gpio_pins"]:
+                if not is_pin(gpio_pin):
+                    Domoticz.Error(f"Invalid GPIO pin {gpio_pin!r}: must be a line offset or \"chip:offset\"")
+                    return False
+                
+                line = split_pin(gpio_pin, self.config["gpio_chip"])
+                if line in output_lines:
+                    Domoticz.Error(f"GPIO pin {gpio_pin!r} is already used")
+                    return False
+                output_lines.add(line)
+                
+                if line[0] in register_bits and line[1] >= register_bits[line[0]]:
+                    Domoticz.Error(f"GPIO pin {gpio_pin!r}: shift register '{line[0]}' has {register_bits[line[0]]} outputs")
+                    return False
             
             # Validate relay_logic value
             if self.config["relay_logic"] not in ["active_low", "active_high"]:
@@ -426,7 +3472,482 @@ class BasePlugin:
                 Domoticz.Error("Must be 'active_low' or 'active_high'")
                 return False
             
-            Domoticz.Log("Configuration loaded successfully")
+            # Validate per-pin relay logic, for boards of both kinds
+            pin_logic = self.config.get("pin_logic", [])
+            if not isinstance(pin_logic, list):
+                Domoticz.Error("'pin_logic' must be a list")
+                return False
+            
+            logic_pins = set()
+            for idx, entry in enumerate(pin_logic):
+                if not isinstance(entry, dict) or not isinstance(entry.get("pins"), list):
+                    Domoticz.Error(f"pin_logic {idx + 1} must have 'pins' and 'relay_logic'")
+                    return False
+                
+                if entry.get("relay_logic") not in ["active_low", "active_high"]:
+                    Domoticz.Error(f"pin_logic {idx + 1}: invalid relay_logic {entry.get('relay_logic')!r}")
+                    Domoticz.Error("Must be 'active_low' or 'active_high'")
+                    return False
+                
+                for gpio_pin in entry["pins"]:
+                    if gpio_pin not in self.config["gpio_pins"]:
+                        Domoticz.Error(f"pin_logic {idx + 1}: GPIO pin {gpio_pin!r} is not in 'gpio_pins'")
+                        return False
+                    if gpio_pin in logic_pins:
+                        Domoticz.Error(f"pin_logic {idx + 1}: GPIO pin {gpio_pin!r} already has a relay_logic")
+                        return False
+                    logic_pins.add(gpio_pin)
+            
+            # Validate relay names: one per relay at most
+            relay_names = self.config.get("relay_names", [])
+            if not isinstance(relay_names, list) or not all(is_name(name) for name in relay_names):
+                Domoticz.Error("'relay_names' must be a list of non-empty names")
+                return False
+            
+            if len(relay_names) > len(self.config["gpio_pins"]):
+                Domoticz.Error(f"'relay_names' has {len(relay_names)} names for {len(self.config['gpio_pins'])} "
+                               f"relays: {relay_names[len(self.config['gpio_pins']):]} have no GPIO pin")
+                return False
+            
+            # Validate backend value
+            if setting(self.config, "backend") not in ["auto", "gpiod", "simulated"]:
+                Domoticz.Error(f"Invalid backend: {self.config['backend']}")
+                Domoticz.Error("Must be 'auto', 'gpiod' or 'simulated'")
+                return False
+            
+            # Validate relay groups
+            relay_groups = self.config.get("relay_groups", [])
+            if not isinstance(relay_groups, list):
+                Domoticz.Error("'relay_groups' must be a list")
+                return False
+            
+            if len(relay_groups) > MAX_GROUPS:
+                Domoticz.Error(f"Too many relay groups (max {MAX_GROUPS})")
+                return False
+            
+            for idx, group in enumerate(relay_groups):
+                if not isinstance(group, dict) or "name" not in group or "pins" not in group:
+                    Domoticz.Error(f"Relay group {idx + 1} must have 'name' and 'pins'")
+                    return False
+                
+                if not is_name(group["name"]):
+                    Domoticz.Error(f"Relay group {idx + 1}: 'name' must be a non-empty string")
+                    return False
+                
+                if not isinstance(group["pins"], list) or len(group["pins"]) == 0:
+                    Domoticz.Error(f"Relay group '{group['name']}': 'pins' must be a non-empty list")
+                    return False
+                
+                unknown_pins = [pin for pin in group["pins"] if pin not in self.config["gpio_pins"]]
+                if unknown_pins:
+                    Domoticz.Error(f"Relay group '{group['name']}': pins {unknown_pins} are not in 'gpio_pins'")
+                    return False
+            
+            # Validate selectors
+            selectors = self.config.get("selectors", [])
+            if not isinstance(selectors, list):
+                Domoticz.Error("'selectors' must be a list")
+                return False
+            
+            if len(selectors) > MAX_SELECTORS:
+                Domoticz.Error(f"Too many selectors (max {MAX_SELECTORS})")
+                return False
+            
+            selector_pins = set()
+            for idx, selector in enumerate(selectors):
+                if not isinstance(selector, dict) or "name" not in selector or "pins" not in selector \
+                        or "levels" not in selector:
+                    Domoticz.Error(f"Selector {idx + 1} must have 'name', 'pins' and 'levels'")
+                    return False
+                
+                name = selector["name"]
+                if not is_name(name):
+                    Domoticz.Error(f"Selector {idx + 1}: 'name' must be a non-empty string")
+                    return False
+                
+                if not isinstance(selector["pins"], list) or len(selector["pins"]) == 0:
+                    Domoticz.Error(f"Selector '{name}': 'pins' must be a non-empty list")
+                    return False
+                
+                unknown_pins = [pin for pin in selector["pins"] if pin not in self.config["gpio_pins"]]
+                if unknown_pins:
+                    Domoticz.Error(f"Selector '{name}': pins {unknown_pins} are not in 'gpio_pins'")
+                    return False
+                
+                # A relay driven by two selectors would make their levels ambiguous
+                shared_pins = [pin for pin in selector["pins"] if pin in selector_pins]
+                if shared_pins:
+                    Domoticz.Error(f"Selector '{name}': pins {shared_pins} are used by another selector")
+                    return False
+                selector_pins.update(selector["pins"])
+                
+                levels = selector["levels"]
+                if not isinstance(levels, list) or not 2 <= len(levels) <= MAX_SELECTOR_LEVELS:
+                    Domoticz.Error(f"Selector '{name}': 'levels' must be a list of 2 to {MAX_SELECTOR_LEVELS} levels")
+                    return False
+                
+                patterns = set()
+                for level_idx, level in enumerate(levels):
+                    if not isinstance(level, dict) or "name" not in level or not isinstance(level.get("pins"), list):
+                        Domoticz.Error(f"Selector '{name}': level {level_idx} must have 'name' and 'pins'")
+                        return False
+                    
+                    if not is_name(level["name"]):
+                        Domoticz.Error(f"Selector '{name}': level {level_idx} 'name' must be a non-empty string")
+                        return False
+                    
+                    unknown_pins = [pin for pin in level["pins"] if pin not in selector["pins"]]
+                    if unknown_pins:
+                        Domoticz.Error(f"Selector '{name}': level '{level['name']}' pins {unknown_pins} "
+                                       f"are not in the selector 'pins'")
+                        return False
+                    
+                    pattern = frozenset(level["pins"])
+                    if pattern in patterns:
+                        Domoticz.Error(f"Selector '{name}': level '{level['name']}' repeats the pins of another level")
+                        return False
+                    patterns.add(pattern)
+                
+                break_ms = setting(selector, "selectors.break_before_make_ms")
+                if not is_number(break_ms, int) or break_ms < 0:
+                    Domoticz.Error(f"Selector '{name}': invalid break_before_make_ms {break_ms}")
+                    return False
+            
+            # Validate command queue settings
+            queue_config = self.config.get("command_queue", {})
+            if not isinstance(queue_config, dict):
+                Domoticz.Error("'command_queue' must be an object")
+                return False
+            
+            if not isinstance(setting(queue_config, "command_queue.enabled"), bool):
+                Domoticz.Error("'command_queue' enabled must be true or false")
+                return False
+            
+            queue_size = setting(queue_config, "command_queue.size")
+            if not is_number(queue_size, int) or queue_size < 1:
+                Domoticz.Error(f"Invalid command_queue size: {queue_size}")
+                return False
+            
+            if setting(queue_config, "command_queue.overflow") not in QUEUE_OVERFLOW_POLICIES:
+                Domoticz.Error(f"Invalid command_queue overflow: {queue_config['overflow']}")
+                Domoticz.Error(f"Must be one of {QUEUE_OVERFLOW_POLICIES}")
+                return False
+            
+            # Validate inputs
+            inputs = self.config.get("inputs", [])
+            if not isinstance(inputs, list):
+                Domoticz.Error("'inputs' must be a list")
+                return False
+            
+            if len(inputs) > MAX_INPUTS:
+                Domoticz.Error(f"Too many inputs (max {MAX_INPUTS})")
+                return False
+            
+            input_pins = []
+            input_lines = set()
+            for idx, input_config in enumerate(inputs):
+                if not isinstance(input_config, dict) or not is_pin(input_config.get("pin")):
+                    Domoticz.Error(f"Input {idx + 1} must have a 'pin' (line offset or \"chip:offset\")")
+                    return False
+                
+                gpio_pin = input_config["pin"]
+                line = split_pin(gpio_pin, self.config["gpio_chip"])
+                if line[0] in register_bits:
+                    Domoticz.Error(f"Input {idx + 1}: shift register '{line[0]}' has no inputs")
+                    return False
+                
+                if line in output_lines or line in input_lines:
+                    Domoticz.Error(f"Input {idx + 1}: GPIO {gpio_pin} is already used")
+                    return False
+                input_pins.append(gpio_pin)
+                input_lines.add(line)
+                
+                if setting(input_config, "inputs.type") not in INPUT_SWITCH_TYPES:
+                    Domoticz.Error(f"Input {idx + 1}: invalid type '{input_config['type']}'")
+                    Domoticz.Error(f"Must be one of {list(INPUT_SWITCH_TYPES)}")
+                    return False
+                
+                if setting(input_config, "inputs.bias") not in INPUT_BIAS:
+                    Domoticz.Error(f"Input {idx + 1}: invalid bias '{input_config['bias']}'")
+                    Domoticz.Error(f"Must be one of {INPUT_BIAS}")
+                    return False
+                
+                debounce_ms = setting(input_config, "inputs.debounce_ms")
+                if not is_number(debounce_ms, int) or debounce_ms < 0:
+                    Domoticz.Error(f"Input {idx + 1}: invalid debounce_ms {debounce_ms}")
+                    return False
+                
+                if "name" in input_config and not is_name(input_config["name"]):
+                    Domoticz.Error(f"Input {idx + 1}: 'name' must be a non-empty string")
+                    return False
+                
+                if not isinstance(setting(input_config, "inputs.active_low"), bool):
+                    Domoticz.Error(f"Input {idx + 1}: 'active_low' must be true or false")
+                    return False
+            
+            # Validate local bindings
+            bindings = self.config.get("bindings", [])
+            if not isinstance(bindings, list):
+                Domoticz.Error("'bindings' must be a list")
+                return False
+            
+            relay_units = range(1, len(self.config["gpio_pins"]) + 1)
+            group_units = range(GROUP_UNIT_BASE, GROUP_UNIT_BASE + len(relay_groups))
+            for idx, binding in enumerate(bindings):
+                if not isinstance(binding, dict) or binding.get("input") not in input_pins:
+                    Domoticz.Error(f"Binding {idx + 1}: 'input' must be a GPIO pin from 'inputs'")
+                    return False
+                
+                unit_num = binding.get("unit")
+                if not is_number(unit_num, int) or unit_num not in relay_units and unit_num not in group_units:
+                    Domoticz.Error(f"Binding {idx + 1}: 'unit' must be a relay or group unit")
+                    return False
+                
+                if binding.get("action") not in BINDING_ACTIONS:
+                    Domoticz.Error(f"Binding {idx + 1}: invalid action '{binding.get('action')}'")
+                    Domoticz.Error(f"Must be one of {BINDING_ACTIONS}")
+                    return False
+                
+                pulse_ms = binding.get("pulse_ms")
+                if binding["action"] == "pulse" and (not is_number(pulse_ms, int) or pulse_ms <= 0):
+                    Domoticz.Error(f"Binding {idx + 1}: 'pulse' needs a positive 'pulse_ms'")
+                    return False
+            
+            # Validate time-proportioning settings
+            proportioning_config = self.config.get("time_proportioning", {})
+            if not isinstance(proportioning_config, dict):
+                Domoticz.Error("'time_proportioning' must be an object")
+                return False
+            
+            if "time_proportioning" in self.config:
+                proportioned_pins = proportioning_config.get("pins")
+                if not isinstance(proportioned_pins, list) or \
+                        any(pin not in self.config["gpio_pins"] for pin in proportioned_pins):
+                    Domoticz.Error("'time_proportioning' pins must be a list of GPIO pins from 'gpio_pins'")
+                    return False
+                
+                # A selector would fight the proportioner over the same relay
+                shared_pins = [pin for pin in proportioned_pins if pin in selector_pins]
+                if shared_pins:
+                    Domoticz.Error(f"'time_proportioning' pins {shared_pins} are used by a selector")
+                    return False
+                
+                cycle_s = proportioning_config.get("cycle_s")
+                if not is_number(cycle_s) or cycle_s <= 0:
+                    Domoticz.Error(f"Invalid time_proportioning cycle_s: {cycle_s}")
+                    return False
+                
+                for key in ("min_on_s", "min_off_s"):
+                    min_time = proportioning_config.get(key, 0)
+                    if not is_number(min_time) or min_time < 0:
+                        Domoticz.Error(f"Invalid time_proportioning {key}: {min_time}")
+                        return False
+                
+                min_s = setting(proportioning_config, "time_proportioning.min_on_s") + \
+                    setting(proportioning_config, "time_proportioning.min_off_s")
+                if min_s > cycle_s:
+                    Domoticz.Error("time_proportioning min_on_s + min_off_s must not exceed cycle_s")
+                    return False
+            
+            # Validate sensors
+            sensors_config = self.config.get("sensors", {})
+            if not isinstance(sensors_config, dict):
+                Domoticz.Error("'sensors' must be an object")
+                return False
+            
+            sensors = sensors_config.get("devices", [])
+            if not isinstance(sensors, list):
+                Domoticz.Error("'sensors' devices must be a list")
+                return False
+            
+            if len(sensors) > MAX_SENSORS:
+                Domoticz.Error(f"Too many sensors (max {MAX_SENSORS})")
+                return False
+            
+            for key in ("interval_s", "report_interval_s"):
+                value = setting(sensors_config, f"sensors.{key}")
+                if not is_number(value) or value <= 0:
+                    Domoticz.Error(f"Invalid sensors {key}: {value}")
+                    return False
+            
+            workers = setting(sensors_config, "sensors.workers")
+            if not is_number(workers, int) or workers < 1:
+                Domoticz.Error(f"Invalid sensors workers: {workers}")
+                return False
+            
+            if not isinstance(setting(sensors_config, "sensors.bus_path"), str):
+                Domoticz.Error("'sensors' bus_path must be a string")
+                return False
+            
+            if not isinstance(setting(sensors_config, "sensors.bulk_conversion"), bool):
+                Domoticz.Error("'sensors' bulk_conversion must be true or false")
+                return False
+            
+            for idx, sensor in enumerate(sensors):
+                if not isinstance(sensor, dict) or "name" not in sensor or \
+                        ("id" in sensor) == ("path" in sensor):
+                    Domoticz.Error(f"Sensor {idx + 1} must have a 'name' and either an 'id' (1-Wire) or a 'path'")
+                    return False
+                
+                if not isinstance(sensor.get("id", sensor.get("path")), str):
+                    Domoticz.Error(f"Sensor {idx + 1}: 'id' / 'path' must be a string")
+                    return False
+                
+                if not is_name(sensor["name"]):
+                    Domoticz.Error(f"Sensor {idx + 1}: 'name' must be a non-empty string")
+                    return False
+                
+                if not isinstance(setting(sensor, "sensors.devices.unit"), str):
+                    Domoticz.Error(f"Sensor {idx + 1}: 'unit' must be a string")
+                    return False
+                
+                if setting(sensor, "sensors.devices.type") not in SENSOR_TYPES:
+                    Domoticz.Error(f"Sensor {idx + 1}: invalid type '{sensor['type']}'")
+                    Domoticz.Error(f"Must be one of {SENSOR_TYPES}")
+                    return False
+                
+                if not is_number(setting(sensor, "sensors.devices.scale")):
+                    Domoticz.Error(f"Sensor {idx + 1}: 'scale' must be a number")
+                    return False
+                
+                threshold = sensor.get("threshold", setting(sensors_config, "sensors.threshold"))
+                if not is_number(threshold) or threshold < 0:
+                    Domoticz.Error(f"Sensor {idx + 1}: invalid threshold {threshold}")
+                    return False
+            
+            # Validate inrush limit settings
+            inrush_config = self.config.get("inrush", {})
+            if not isinstance(inrush_config, dict):
+                Domoticz.Error("'inrush' must be an object")
+                return False
+            
+            if "inrush" in self.config:
+                max_on = inrush_config.get("max_on")
+                if not is_number(max_on, int) or max_on < 1:
+                    Domoticz.Error(f"Invalid inrush max_on: {max_on}")
+                    return False
+                
+                spacing_ms = setting(inrush_config, "inrush.spacing_ms")
+                if not is_number(spacing_ms) or spacing_ms <= 0:
+                    Domoticz.Error(f"Invalid inrush spacing_ms: {spacing_ms}")
+                    return False
+                
+                urgent_pins = inrush_config.get("urgent_pins", [])
+                if not isinstance(urgent_pins, list) or any(pin not in self.config["gpio_pins"] for pin in urgent_pins):
+                    Domoticz.Error("'inrush' urgent_pins must be a list of GPIO pins from 'gpio_pins'")
+                    return False
+            
+            # Validate relay timers
+            relay_timers = self.config.get("relay_timers", [])
+            if not isinstance(relay_timers, list):
+                Domoticz.Error("'relay_timers' must be a list")
+                return False
+            
+            for idx, relay_timer in enumerate(relay_timers):
+                if not isinstance(relay_timer, dict) or relay_timer.get("pin") not in self.config["gpio_pins"]:
+                    Domoticz.Error(f"Relay timer {idx + 1}: 'pin' must be a GPIO pin from 'gpio_pins'")
+                    return False
+                
+                if ("pulse_ms" in relay_timer) == ("auto_off_s" in relay_timer):
+                    Domoticz.Error(f"Relay timer {idx + 1}: set either 'pulse_ms' or 'auto_off_s'")
+                    return False
+                
+                duration = relay_timer.get("pulse_ms", relay_timer.get("auto_off_s"))
+                if not is_number(duration) or duration <= 0:
+                    Domoticz.Error(f"Relay timer {idx + 1}: duration must be a positive number")
+                    return False
+            
+            # Validate metrics settings
+            metrics_config = self.config.get("metrics", {})
+            if not isinstance(metrics_config, dict):
+                Domoticz.Error("'metrics' must be an object")
+                return False
+            
+            if setting(metrics_config, "metrics.format") not in METRICS_FORMATS:
+                Domoticz.Error(f"Invalid metrics format: {metrics_config['format']}")
+                Domoticz.Error(f"Must be one of {METRICS_FORMATS}")
+                return False
+            
+            interval_s = setting(metrics_config, "metrics.interval_s")
+            if not is_number(interval_s) or interval_s <= 0:
+                Domoticz.Error(f"Invalid metrics interval_s: {interval_s}")
+                return False
+            
+            if not isinstance(metrics_config.get("file", ""), str):
+                Domoticz.Error("'metrics' file must be a string")
+                return False
+            
+            if not isinstance(setting(metrics_config, "metrics.domoticz_sensors"), bool):
+                Domoticz.Error("'metrics' domoticz_sensors must be true or false")
+                return False
+            
+            # Validate state journal settings
+            journal_config = self.config.get("state_journal", {})
+            if not isinstance(journal_config, dict):
+                Domoticz.Error("'state_journal' must be an object")
+                return False
+            
+            if not isinstance(setting(journal_config, "state_journal.file"), str):
+                Domoticz.Error("'state_journal' file must be a string")
+                return False
+            
+            sync_interval_ms = setting(journal_config, "state_journal.sync_interval_ms")
+            if not is_number(sync_interval_ms, int) or sync_interval_ms < 0:
+                Domoticz.Error(f"Invalid state_journal sync_interval_ms: {sync_interval_ms}")
+                return False
+            
+            # Validate trace settings
+            trace_config = self.config.get("trace", {})
+            if not isinstance(trace_config, dict):
+                Domoticz.Error("'trace' must be an object")
+                return False
+            
+            if not isinstance(setting(trace_config, "trace.file"), str):
+                Domoticz.Error("'trace' file must be a string")
+                return False
+            
+            if not isinstance(setting(trace_config, "trace.gpio_writes"), bool):
+                Domoticz.Error("'trace' gpio_writes must be true or false")
+                return False
+            
+            # Validate control socket settings
+            control_config = self.config.get("control_socket", {})
+            if not isinstance(control_config, dict):
+                Domoticz.Error("'control_socket' must be an object")
+                return False
+            
+            if not isinstance(setting(control_config, "control_socket.path"), str):
+                Domoticz.Error("'control_socket' path must be a string")
+                return False
+            
+            mode = setting(control_config, "control_socket.mode")
+            if not isinstance(mode, str) or not mode or any(digit not in "01234567" for digit in mode):
+                Domoticz.Error(f"Invalid control_socket mode: {mode} (octal string, e.g. \"660\")")
+                return False
+            
+            # Validate readback settings
+            readback_config = self.config.get("readback", {})
+            if not isinstance(readback_config, dict):
+                Domoticz.Error("'readback' must be an object")
+                return False
+            
+            if setting(readback_config, "readback.policy") not in READBACK_POLICIES:
+                Domoticz.Error(f"Invalid readback policy: {readback_config['policy']}")
+                Domoticz.Error(f"Must be one of {READBACK_POLICIES}")
+                return False
+            
+            interval_s = setting(readback_config, "readback.interval_s")
+            max_interval_s = setting(readback_config, "readback.max_interval_s")
+            if not is_number(interval_s) or not is_number(max_interval_s) or not 0 < interval_s <= max_interval_s:
+                Domoticz.Error(f"Invalid readback interval_s {interval_s!r} / max_interval_s {max_interval_s!r}: "
+                               f"numbers with 0 < interval_s <= max_interval_s")
+                return False
+            
+            if not isinstance(setting(self.config, "config_reload"), bool):
+                Domoticz.Error("'config_reload' must be true or false")
+                return False
+            
+            self.debug("Configuration loaded successfully")
             return True
             
         except json.JSONDecodeError as e:
@@ -450,3 +3971,7 @@ def onStop():
 def onCommand(Unit, Command, Level, Hue):
     global _plugin
     _plugin.onCommand(Unit, Command, Level, Hue)
+
+def onHeartbeat():
+    global _plugin
+    _plugin.onHeartbeat()
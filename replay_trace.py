@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Replay a command trace through the Domoticz RPI GPIO plugin
+
+Feeds the onCommand calls and control socket requests of a trace recorded
+with "trace" in gpio_config.json back through BasePlugin, with the stub
+Domoticz module of test_relay.py and the simulated GPIO chip, and reports:
+
+  - throughput and onCommand latency (percentiles, as test_relay.py)
+  - number of GPIO writes, recorded and replayed
+  - final GPIO levels that differ between the recording and the replay
+
+A trace file holds one session per plugin start; the last one is replayed
+unless --session is given. --speed 1 replays at the recorded pace, 10 ten
+times faster, 0 as fast as possible:
+
+  python3 replay_trace.py trace.jsonl
+  python3 replay_trace.py trace.jsonl --speed 0 --output run.json
+  python3 replay_trace.py trace.jsonl --speed 0 --compare run.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import test_relay
+from test_relay import PLUGIN_DIR
+
+
+def load_sessions(trace_file):
+    """Sessions of a trace file: [(header, records)]"""
+    sessions = []
+    with open(trace_file) as f:
+        for line_num, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # The last line of a trace cut off by a crash
+                print(f"Skipping unreadable line {line_num}", file=sys.stderr)
+                continue
+            if isinstance(record, dict):
+                sessions.append((record, []))
+            elif sessions:
+                sessions[-1][1].append(record)
+    return sessions
+
+
+def final_levels(header, records):
+    """GPIO levels after all writes of a session"""
+    levels = {json.dumps(gpio_pin): value for gpio_pin, value in header["levels"]}
+    for record in records:
+        if record[1] == "w":
+            for gpio_pin, value in record[2]:
+                levels[json.dumps(gpio_pin)] = value
+    return levels
+
+
+def replay_config(header, trace_file):
+    """Recorded configuration, made to run without hardware or side effects"""
+    config = dict(header["config"])
+    config["backend"] = "simulated"
+    config["config_reload"] = False
+    config["trace"] = {"file": trace_file, "gpio_writes": True}
+    for key in ("state_journal", "control_socket", "sensors", "metrics"):
+        config.pop(key, None)
+    return config
+
+
+def create_devices(plugin, header):
+    """Relay devices with the recorded initial states, before onStart"""
+    config = header["config"]
+    # Levels are logical (1 = on) since trace version 2, physical before
+    on_value = 1
+    if header["trace"] < 2 and plugin.setting(config, "relay_logic") == "active_low":
+        on_value = 0
+    levels = {json.dumps(gpio_pin): value for gpio_pin, value in header["levels"]}
+    plugin.Devices.clear()
+    for idx, gpio_pin in enumerate(config["gpio_pins"]):
+        device = plugin.Domoticz.Device(Name=f"Relay {idx + 1}", Unit=idx + 1, Type=244, Subtype=73)
+        device.Create()
+        if levels.get(json.dumps(gpio_pin)) == on_value:
+            device.nValue, device.sValue = 1, "On"
+
+
+def replay(plugin, header, records, speed):
+    """Replay one session; returns (onCommand latencies, seconds, replayed records)"""
+    config_file = os.path.join(PLUGIN_DIR, ".replay_config.json")
+    trace_file = os.path.join(PLUGIN_DIR, ".replay_trace.jsonl")
+    with open(config_file, "w") as f:
+        json.dump(replay_config(header, trace_file), f)
+    if os.path.exists(trace_file):
+        os.remove(trace_file)
+
+    try:
+        create_devices(plugin, header)
+        base_plugin = plugin.BasePlugin()
+        base_plugin.config_file = config_file
+        base_plugin.onStart()
+        if not base_plugin.enabled:
+            raise RuntimeError("plugin failed to start, see errors above")
+
+        latencies = []
+        clock = time.perf_counter_ns
+        start = time.monotonic()
+        for record in records:
+            if speed:
+                delay = start + record[0] / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if record[1] == "c":
+                command_start = clock()
+                base_plugin.onCommand(*record[2:6])
+                latencies.append(clock() - command_start)
+            elif record[1] == "s":
+                base_plugin.control_request(record[2], lambda line: None)
+
+        # Timers of the recording run out before the plugin stops
+        if speed and records:
+            delay = start + records[-1][0] / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Writes still ahead (pulses, auto-off, inrush slices, break-before-
+        # make) run on the plugin's clock, whatever the replay speed
+        while (base_plugin.scheduler.timers or base_plugin.inrush_pending
+               or base_plugin.command_queue and base_plugin.command_queue.pending):
+            time.sleep(0.01)
+
+        # onStop lets the command worker apply what is still queued
+        base_plugin.onStop()
+        elapsed = time.monotonic() - start
+        replayed = load_sessions(trace_file)[-1][1]
+    finally:
+        os.remove(config_file)
+        if os.path.exists(trace_file):
+            os.remove(trace_file)
+
+    return latencies, elapsed, replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a command trace of the Domoticz RPI GPIO plugin")
+    parser.add_argument("trace", help="trace file recorded with \"trace\" in gpio_config.json")
+    parser.add_argument("--session", type=int, default=-1, help="session to replay (default: the last one)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed: 1 = recorded pace, 0 = as fast as possible (default: 1)")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="p50 slowdown in %% reported as regression (default: 20)")
+    args = parser.parse_args()
+
+    sessions = load_sessions(args.trace)
+    if not sessions:
+        print(f"No sessions in {args.trace}", file=sys.stderr)
+        sys.exit(1)
+    header, records = sessions[args.session]
+
+    plugin = test_relay.import_plugin()
+    latencies, elapsed, replayed = replay(plugin, header, records, args.speed)
+
+    recorded_levels = final_levels(header, records)
+    replayed_levels = final_levels(header, replayed)
+    state_diff = {
+        gpio_pin: {"recorded": recorded_levels.get(gpio_pin), "replayed": replayed_levels.get(gpio_pin)}
+        for gpio_pin in sorted(set(recorded_levels) | set(replayed_levels))
+        if recorded_levels.get(gpio_pin) != replayed_levels.get(gpio_pin)
+    }
+    commands = sum(1 for record in records if record[1] in ("c", "s"))
+
+    results = {
+        "plugin_version": test_relay.plugin_version(),
+        "machine": test_relay.machine_model(),
+        "python": platform.python_version(),
+        "trace": os.path.abspath(args.trace),
+        "session": args.session % len(sessions),
+        "speed": args.speed,
+        "commands": commands,
+        "commands_per_s": round(commands / elapsed, 1) if elapsed else None,
+        "gpio_writes": {
+            "recorded": sum(1 for record in records if record[1] == "w"),
+            "replayed": sum(1 for record in replayed if record[1] == "w"),
+        },
+        "final_state_diff": state_diff,
+        "results": {},
+    }
+    if latencies:
+        results["results"]["on_command"] = test_relay.summarize(latencies)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare and test_relay.compare(results, args.compare, args.threshold):
+        sys.exit(2)
+    if state_diff:
+        print(f"Final GPIO levels differ for {len(state_diff)} pins", file=sys.stderr)
+        sys.exit(3)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,171 +1,331 @@
 #!/usr/bin/env python3
 """
-Test script pre Waveshare Relay Board GPIO
-Otestuje všetky relé bez Domoticz
+Throughput / latency benchmark for the Domoticz RPI GPIO plugin
+
+Reads gpio_config.json and runs the plugin's own GPIO backends (gpiod v1,
+gpiod v2 or the simulated chip) without Domoticz:
+
+  - single-line toggle rate
+  - batched multi-line write rate
+  - line request/release cost
+  - end-to-end BasePlugin.onCommand latency (stub Domoticz/Devices)
+
+Results are printed as JSON with percentiles, so runs on different Pi models
+and plugin versions can be compared:
+
+  python3 test_relay.py --backend simulated
+  python3 test_relay.py --output pi4.json
+  python3 test_relay.py --compare pi4.json
 """
 
+import argparse
+import json
+import os
+import platform
+import re
 import sys
+import tempfile
 import time
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+def make_domoticz_stub():
+    """Minimal stand-in for the Domoticz module, enough to run plugin.py"""
+    domoticz = types.ModuleType("Domoticz")
+    domoticz.messages = []
+    domoticz.configuration = {}
+
+    def log(message):
+        domoticz.messages.append(message)
+
+    def error(message):
+        domoticz.messages.append(message)
+        print(f"plugin error: {message}", file=sys.stderr)
+
+    def configuration(value=None):
+        # Domoticz keeps a copy per hardware, changes only count once stored
+        if value is not None:
+            domoticz.configuration = json.loads(json.dumps(value))
+        return json.loads(json.dumps(domoticz.configuration))
+
+    class Device:
+        def __init__(self, Name="", Unit=0, TypeName="", Used=0, Type=0, Subtype=0, Switchtype=0, **kwargs):
+            self.Name = Name
+            self.Unit = Unit
+            self.TypeName = TypeName
+            self.Used = Used
+            self.Type = Type
+            self.SubType = Subtype
+            self.SwitchType = Switchtype
+            self.TimedOut = 0
+            self.Options = kwargs.get("Options", {})
+            self.nValue = 0
+            self.sValue = ""
+
+        def Create(self):
+            sys.modules["plugin"].Devices[self.Unit] = self
+
+        def Update(self, nValue, sValue, **kwargs):
+            self.nValue = nValue
+            self.sValue = sValue
+            self.Name = kwargs.get("Name", self.Name)
+            self.Type = kwargs.get("Type", self.Type)
+            self.SubType = kwargs.get("Subtype", self.SubType)
+            self.SwitchType = kwargs.get("Switchtype", self.SwitchType)
+            self.TimedOut = kwargs.get("TimedOut", self.TimedOut)
+
+        def Delete(self):
+            del sys.modules["plugin"].Devices[self.Unit]
+
+    domoticz.Log = log
+    domoticz.Status = log
+    domoticz.Debug = log
+    domoticz.Error = error
+    domoticz.Debugging = lambda mode: None
+    domoticz.Heartbeat = lambda seconds: None
+    domoticz.Device = Device
+    domoticz.Configuration = configuration
+    return domoticz
+
+
+def import_plugin():
+    """Import plugin.py from this directory with the stub Domoticz module"""
+    sys.modules.setdefault("Domoticz", make_domoticz_stub())
+    if PLUGIN_DIR not in sys.path:
+        sys.path.insert(0, PLUGIN_DIR)
+    import plugin
+    plugin.Devices = {}
+    plugin.Parameters = {"Mode6": "Normal", "HomeFolder": PLUGIN_DIR + "/"}
+    return plugin
+
+
+def plugin_version():
+    with open(os.path.join(PLUGIN_DIR, "plugin.py")) as f:
+        match = re.search(r'<plugin [^>]*version="([^"]+)"', f.read())
+    return match.group(1) if match else "unknown"
+
+
+def machine_model():
+    """Raspberry Pi model from the device tree, or the CPU architecture"""
+    try:
+        with open("/proc/device-tree/model") as f:
+            return f.read().rstrip("\x00\n")
+    except OSError:
+        return platform.machine()
+
+
+def summarize(latencies_ns, operations=None):
+    """Percentiles (microseconds) and rate of a list of per-call durations"""
+    latencies_ns = sorted(latencies_ns)
+    count = len(latencies_ns)
+    total_ns = sum(latencies_ns)
+
+    def percentile(p):
+        return latencies_ns[min(count - 1, int(count * p / 100))] / 1000
+
+    return {
+        "count": count,
+        "ops_per_s": round((operations or count) / (total_ns / 1e9), 1) if total_ns else None,
+        "mean_us": round(total_ns / count / 1000, 2),
+        "min_us": round(latencies_ns[0] / 1000, 2),
+        "p50_us": round(percentile(50), 2),
+        "p90_us": round(percentile(90), 2),
+        "p99_us": round(percentile(99), 2),
+        "max_us": round(latencies_ns[-1] / 1000, 2),
+    }
+
+
+def bench_single_toggle(backend, gpio_pins, iterations):
+    """Toggle one line per call, cycling through all pins"""
+    latencies = []
+    values = {gpio_pin: 0 for gpio_pin in gpio_pins}
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        gpio_pin = gpio_pins[i % len(gpio_pins)]
+        value = values[gpio_pin] ^ 1
+        start = clock()
+        backend.set_value(gpio_pin, value)
+        latencies.append(clock() - start)
+        values[gpio_pin] = value
+    backend.set_values({gpio_pin: 0 for gpio_pin in gpio_pins})
+    return summarize(latencies)
+
+
+def bench_batched_write(backend, gpio_pins, iterations):
+    """Write all lines with one set_values() call"""
+    latencies = []
+    on_values = {gpio_pin: 1 for gpio_pin in gpio_pins}
+    off_values = {gpio_pin: 0 for gpio_pin in gpio_pins}
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        values = on_values if i % 2 == 0 else off_values
+        start = clock()
+        backend.set_values(values)
+        latencies.append(clock() - start)
+    backend.set_values(off_values)
+    result = summarize(latencies)
+    result["lines_per_write"] = len(gpio_pins)
+    return result
+
+
+def bench_request_release(plugin, backend_name, gpio_chip, shift_registers, gpio_pins, iterations, active_low):
+    """Request all lines (switched off) and release them again"""
+    latencies = []
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        backend = plugin.ChipSet(backend_name, gpio_chip, shift_registers)
+        start = clock()
+        backend.open({gpio_pin: 0 for gpio_pin in gpio_pins}, active_low)
+        backend.release()
+        latencies.append(clock() - start)
+    return summarize(latencies)
+
+
+def bench_on_command(plugin, config_file, backend_name, iterations):
+    """End-to-end BasePlugin.onCommand latency, commands applied synchronously"""
+    with open(config_file) as f:
+        config = json.load(f)
+
+    # Measure the command path itself: no worker thread or reload, and none
+    # of the files and sockets of the installed plugin
+    config["backend"] = backend_name
+    config["command_queue"] = {"enabled": False}
+    config["config_reload"] = False
+    for key in ("metrics", "state_journal", "control_socket", "trace", "sensors"):
+        config.pop(key, None)
+
+    fd, bench_config_file = tempfile.mkstemp(prefix="bench_config.", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(config, f)
 
-try:
-    import gpiod
-except ImportError:
-    print("ERROR: python3-gpiod nie je nainštalované!")
-    print("Spusti: sudo apt install python3-gpiod")
-    sys.exit(1)
-
-# GPIO piny pre relé
-RELAY_PINS = {
-    1: 5,
-    2: 6,
-    3: 13,
-    4: 16,
-    5: 19,
-    6: 20,
-    7: 21,
-    8: 26
-}
-
-def test_relay_board():
-    print("=" * 60)
-    print("Waveshare Relay Board - GPIO Test")
-    print("=" * 60)
-    print()
-    
     try:
-        # Otvor GPIO chip
-        chip = gpiod.Chip('gpiochip0')
-        print(f"✓ Otvorený GPIO chip: {chip.name()}")
-        print()
-        
-        # Získaj všetky GPIO line objekty
-        lines = {}
-        print("Konfigurácia GPIO pinov:")
-        for relay_num, gpio_pin in RELAY_PINS.items():
-            line = chip.get_line(gpio_pin)
-            line.request(
-                consumer="relay-test",
-                type=gpiod.LINE_REQ_DIR_OUT,
-                default_vals=[1]  # HIGH = Relay OFF
-            )
-            lines[relay_num] = line
-            print(f"  ✓ Relay {relay_num} -> GPIO {gpio_pin} (Pin {get_physical_pin(gpio_pin)})")
-        
-        print()
-        print("-" * 60)
-        print("ZAČÍNAM TEST - Pozoruj relé na doske!")
-        print("-" * 60)
-        print()
-        
-        # Test 1: Postupné zapínanie/vypínanie
-        print("Test 1: Postupné zapínanie každého relé (1s)")
-        for relay_num in range(1, 9):
-            print(f"  → Relay {relay_num} ON", end="", flush=True)
-            lines[relay_num].set_value(0)  # LOW = ON
-            time.sleep(1)
-            print(f" → OFF")
-            lines[relay_num].set_value(1)  # HIGH = OFF
-            time.sleep(0.5)
-        
-        print()
-        
-        # Test 2: Všetky naraz
-        print("Test 2: Všetky relé ZAP")
-        for relay_num in range(1, 9):
-            lines[relay_num].set_value(0)  # LOW = ON
-        print("  → Všetky relé sú zapnuté (počuj kliknutie)")
-        time.sleep(3)
-        
-        print("Test 2: Všetky relé VYP")
-        for relay_num in range(1, 9):
-            lines[relay_num].set_value(1)  # HIGH = OFF
-        print("  → Všetky relé sú vypnuté")
-        time.sleep(2)
-        
-        print()
-        
-        # Test 3: Blikanie
-        print("Test 3: Blikanie (3x)")
-        for i in range(3):
-            print(f"  → Bliknutie {i+1}/3")
-            for relay_num in range(1, 9):
-                lines[relay_num].set_value(0)  # ON
-            time.sleep(0.3)
-            for relay_num in range(1, 9):
-                lines[relay_num].set_value(1)  # OFF
-            time.sleep(0.3)
-        
-        print()
-        print("-" * 60)
-        print("TEST DOKONČENÝ!")
-        print("-" * 60)
-        print()
-        
-        # Cleanup - vypni všetky relé
-        print("Čistenie: Vypínam všetky relé...")
-        for relay_num, line in lines.items():
-            line.set_value(1)  # HIGH = OFF
-            line.release()
-        
-        print("✓ GPIO piny uvoľnené")
-        print()
-        print("=" * 60)
-        print("Ak si videl/počul relé prepínať, GPIO funguje správne!")
-        print("Môžeš pokračovať v inštalácii Domoticz pluginu.")
-        print("=" * 60)
-        
+        plugin.Devices.clear()
+        base_plugin = plugin.BasePlugin()
+        base_plugin.config_file = bench_config_file
+        base_plugin.onStart()
+        if not base_plugin.enabled:
+            raise RuntimeError("plugin failed to start, see errors above")
+
+        units = sorted(base_plugin.lines)
+        latencies = []
+        clock = time.perf_counter_ns
+        for i in range(iterations):
+            unit_num = units[i % len(units)]
+            command = "On" if (i // len(units)) % 2 == 0 else "Off"
+            start = clock()
+            base_plugin.onCommand(unit_num, command, 0, 0)
+            latencies.append(clock() - start)
+
+        base_plugin.onStop()
+    finally:
+        os.remove(bench_config_file)
+
+    return summarize(latencies)
+
+
+def compare(results, baseline_file, threshold):
+    """Print p50 changes against a baseline run; returns True on regression"""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+
+    regression = False
+    print(f"Compared with {baseline_file} ({baseline.get('plugin_version')}, {baseline.get('machine')}):", file=sys.stderr)
+    for name, result in results["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            continue
+        change = (result["p50_us"] - old["p50_us"]) / old["p50_us"] * 100 if old["p50_us"] else 0
+        marker = ""
+        if change > threshold:
+            marker = "  REGRESSION"
+            regression = True
+        print(f"  {name:22} p50 {old['p50_us']:>10.2f} -> {result['p50_us']:>10.2f} us ({change:+.1f}%){marker}", file=sys.stderr)
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Domoticz RPI GPIO plugin backends")
+    parser.add_argument("--config", default=os.path.join(PLUGIN_DIR, "gpio_config.json"),
+                        help="configuration file (default: gpio_config.json next to this script)")
+    parser.add_argument("--backend", choices=["auto", "gpiod", "simulated"],
+                        help="GPIO backend (default: 'backend' from the configuration)")
+    parser.add_argument("--iterations", type=int, default=1000, help="calls per benchmark (default: 1000)")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="p50 slowdown in %% reported as regression (default: 20)")
+    parser.add_argument("--yes", action="store_true", help="don't ask before switching real relays")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    # Same defaults as the plugin's load_config
+    plugin = import_plugin()
+    config.setdefault("relay_logic", plugin.CONFIG_DEFAULTS["relay_logic"])
+    config.setdefault("gpio_chip", plugin.CONFIG_DEFAULTS["gpio_chip"])
+    backend_name = args.backend or plugin.setting(config, "backend")
+    gpio_pins = config["gpio_pins"]
+    gpio_chip = config["gpio_chip"]
+    shift_registers = config.get("shift_registers", [])
+
+    # Values are logical (1 = relay on): as in the plugin, the lines of
+    # active-low relays invert them
+    active_low = [relay.pin for relay in plugin.compile_relays(config)[1:] if relay.active_low]
+
+    if backend_name != "simulated" and not args.yes:
+        print("WARNING: this benchmark switches all configured relays very fast!", file=sys.stderr)
+        print("Make sure nothing is connected to the relays.", file=sys.stderr)
+        answer = input("Continue? (yes/no): ").strip().lower()
+        if answer not in ["y", "yes"]:
+            print("Benchmark cancelled.", file=sys.stderr)
+            sys.exit(0)
+
+    backend = plugin.ChipSet(backend_name, gpio_chip, shift_registers)
+
+    results = {
+        "plugin_version": plugin_version(),
+        "machine": machine_model(),
+        "python": platform.python_version(),
+        "backend": backend.name,
+        "gpio_chip": gpio_chip,
+        "gpio_pins": gpio_pins,
+        "iterations": args.iterations,
+        "results": {},
+    }
+
+    try:
+        backend.open({gpio_pin: 0 for gpio_pin in gpio_pins}, active_low)
+        try:
+            # Same write path as the plugin: pins on one chip skip the routing
+            writer = backend.single or backend
+            results["results"]["single_line_toggle"] = bench_single_toggle(
+                writer, gpio_pins, args.iterations)
+            results["results"]["batched_write"] = bench_batched_write(
+                writer, gpio_pins, args.iterations)
+        finally:
+            backend.release()
+
+        results["results"]["request_release"] = bench_request_release(
+            plugin, backend_name, gpio_chip, shift_registers, gpio_pins, max(1, args.iterations // 10), active_low)
+        results["results"]["on_command"] = bench_on_command(
+            plugin, args.config, backend_name, args.iterations)
     except PermissionError:
-        print()
-        print("ERROR: Nemáš oprávnenie na prístup k GPIO!")
-        print()
-        print("Riešenia:")
-        print("1. Spusti skript ako root: sudo python3 test_relay.py")
-        print("2. Alebo pridaj používateľa do gpio skupiny:")
-        print("   sudo usermod -a -G gpio $USER")
-        print("   potom sa odhláš a znovu prihláš")
-        sys.exit(1)
-        
-    except Exception as e:
-        print()
-        print(f"ERROR: {str(e)}")
-        print()
-        print("Možné problémy:")
-        print("1. GPIO chip 'gpiochip0' neexistuje")
-        print("2. GPIO piny sú už použité iným procesom")
-        print("3. Hardvér nie je správne pripojený")
-        print()
-        print("Skús:")
-        print("  ls -la /dev/gpiochip*")
-        print("  gpioinfo gpiochip0")
+        print("ERROR: no permission to access the GPIO chip", file=sys.stderr)
+        print("Run as root or add the user to the gpio group:", file=sys.stderr)
+        print("  sudo usermod -a -G gpio $USER", file=sys.stderr)
         sys.exit(1)
 
-def get_physical_pin(bcm_pin):
-    """Vráti číslo fyzického pinu pre daný BCM pin"""
-    pin_mapping = {
-        5: 29,
-        6: 31,
-        13: 33,
-        16: 36,
-        19: 35,
-        20: 38,
-        21: 40,
-        26: 37
-    }
-    return pin_mapping.get(bcm_pin, "?")
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(2)
+
 
 if __name__ == "__main__":
-    print()
-    print("POZOR: Tento test bude prepínať všetky relé!")
-    print("Uisti sa, že:")
-    print("  - Relay Board je správne pripojená k RPi")
-    print("  - K relé NIČ nie je pripojené (alebo je to bezpečné)")
-    print("  - Máš napájanie pripojené (ak je potrebné)")
-    print()
-    
-    odpoved = input("Pokračovať? (ano/nie): ").strip().lower()
-    if odpoved not in ['ano', 'a', 'y', 'yes']:
-        print("Test zrušený.")
-        sys.exit(0)
-    
-    print()
-    test_relay_board()
+    main()